@@ -1,5 +1,8 @@
 import os
 
+import pytest
+from django.core.cache import cache
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +40,10 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Версии страниц сдвигаются по коммиту, а тест в транзакции его не
+    # делает: кэш прошлого теста иначе переживёт откат его данных.
+    cache.clear()
@@ -0,0 +1,198 @@
+from importlib import import_module
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.testing import assert_max_queries
+from posts.counters import get_stats
+from posts.models import Comment, Follow, Group, Post
+
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls', 'api.urls')
+POSTS = 30
+AUTHORS = 6
+
+# Бюджет запросов на страницу: (аноним, авторизованный пользователь).
+# Сессия и пользователь авторизованного стоят ещё два запроса.
+# Бюджет не зависит от числа постов на странице: лишний запрос на пост
+# выбивает любой из них.
+BUDGETS = {
+    'posts:index': (1, 3),
+    'posts:group_list': (2, 4),
+    'posts:profile': (3, 6),
+    # Один из запросов — ETag поста для условного GET.
+    'posts:post_detail': (4, 6),
+    # Число найденных, id страницы из индекса и сами посты.
+    'posts:search': (3, 5),
+    # Холодный индекс подсказок: группы и пользователи.
+    'posts:autocomplete': (2, 4),
+    # Отправка форм: запись, счётчики и области страниц для сброса кэша.
+    'posts:post_create': (0, 6),
+    'posts:post_edit': (0, 8),
+    'posts:add_comment': (0, 6),
+    # Слияние лент подписок: по запросу на каждого автора.
+    'posts:follow_index': (0, 3 + AUTHORS),
+    # Строки выгрузки читаются уже при отдаче потокового ответа.
+    'posts:export': (0, 2),
+    'posts:profile_follow': (0, 4),
+    'posts:profile_unfollow': (0, 8),
+    'users:signup': (1, 3),
+    'users:logout': (0, 4),
+    'users:login': (0, 2),
+    'users:password_reset': (0, 2),
+    'users:password_reset_confirm': (5, 5),
+    'users:password_reset_complete': (0, 2),
+    'users:password_reset_done': (1, 3),
+    'users:password_change': (0, 2),
+    'users:password_change_done': (0, 2),
+    # API не трогает сессию: авторизованному столько же запросов.
+    'api:posts': (1, 1),
+    'api:group_posts': (2, 2),
+    'api:user_posts': (2, 2),
+    'api:post_detail': (3, 3),
+    # Ленты RSS и Atom одинаковы для всех и сессию не трогают.
+    'posts:index_rss': (1, 1),
+    'posts:index_atom': (1, 1),
+    'posts:group_rss': (2, 2),
+    'posts:group_atom': (2, 2),
+    'posts:profile_rss': (2, 2),
+    'posts:profile_atom': (2, 2),
+    'about:author': (0, 2),
+    'about:tech': (0, 2),
+}
+
+# Страницы записи проверяются отправкой формы, а не её показом.
+POST_DATA = {
+    'posts:post_create': {'text': 'Новый пост'},
+    'posts:post_edit': {'text': 'Правка'},
+    'posts:add_comment': {'text': 'Комментарий'},
+    'posts:profile_follow': {},
+    'posts:profile_unfollow': {},
+}
+
+LOGIN_REQUIRED = {
+    'posts:post_create',
+    'posts:post_edit',
+    'posts:add_comment',
+    'posts:follow_index',
+    'posts:export',
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+    'users:password_change',
+    'users:password_change_done',
+}
+
+# Ответы не 200: после записи и по ссылке сброса пароля — редирект.
+STATUSES = {
+    'posts:post_create': 302,
+    'posts:post_edit': 302,
+    'posts:add_comment': 302,
+    'posts:profile_follow': 302,
+    'posts:profile_unfollow': 302,
+    'users:password_reset_confirm': 302,
+}
+
+
+def url_names():
+    for urlconf in URLCONFS:
+        module = import_module(urlconf)
+        for pattern in module.urlpatterns:
+            yield f'{module.app_name}:{pattern.name}'
+
+
+@pytest.fixture
+def feed(mixer, user, another_user):
+    """Лента, на которой лишний запрос на пост сразу заметен."""
+    authors = [another_user] + mixer.cycle(AUTHORS - 1).blend(
+        'auth.User'
+    )
+    groups = mixer.cycle(3).blend(Group)
+    posts = [
+        Post.objects.create(
+            author=authors[index % AUTHORS],
+            group=groups[index % 3],
+            text=f'Пост {index}',
+        )
+        for index in range(POSTS)
+    ]
+    for author in authors:
+        Follow.objects.create(user=user, author=author)
+        Comment.objects.create(post=posts[-1], author=author, text='Ок')
+    own_post = Post.objects.create(author=user, text='Свой пост')
+    # Счётчики авторов уже материализованы, как на живом сайте.
+    for author in authors + [user]:
+        get_stats(author)
+    return {
+        'post': posts[-1],
+        'own_post': own_post,
+        'group': groups[0],
+        'author': another_user,
+        'user': user,
+    }
+
+
+def url_kwargs(name, feed):
+    user = feed['user']
+    return {
+        'posts:group_list': {'slug': feed['group'].slug},
+        'posts:profile': {'username': feed['author'].username},
+        'posts:group_rss': {'slug': feed['group'].slug},
+        'posts:group_atom': {'slug': feed['group'].slug},
+        'posts:profile_rss': {'username': feed['author'].username},
+        'posts:profile_atom': {'username': feed['author'].username},
+        'posts:post_detail': {'post_id': feed['post'].pk},
+        'api:group_posts': {'slug': feed['group'].slug},
+        'api:user_posts': {'username': feed['author'].username},
+        'api:post_detail': {'post_id': feed['post'].pk},
+        'posts:post_edit': {'post_id': feed['own_post'].pk},
+        'posts:add_comment': {'post_id': feed['post'].pk},
+        'posts:profile_follow': {'username': feed['author'].username},
+        'posts:profile_unfollow': {'username': feed['author'].username},
+        'users:password_reset_confirm': {
+            'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': default_token_generator.make_token(user),
+        },
+    }.get(name, {})
+
+
+def expected_status(name, authorized):
+    if name in LOGIN_REQUIRED and not authorized:
+        return 302
+    return STATUSES.get(name, 200)
+
+
+def url_query(name):
+    return {
+        'posts:search': {'q': 'Пост'},
+        'posts:autocomplete': {'q': 'a'},
+    }.get(name, {})
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    def test_every_url_has_budget(self):
+        missing = set(url_names()) - set(BUDGETS)
+        assert not missing, (
+            f'Задайте бюджет SQL запросов для адресов: {sorted(missing)}'
+        )
+
+    @pytest.mark.parametrize('name', sorted(BUDGETS))
+    @pytest.mark.parametrize('authorized', (False, True))
+    def test_budget(self, name, authorized, feed, client):
+        if authorized:
+            client.force_login(feed['user'])
+        url = reverse(name, kwargs=url_kwargs(name, feed))
+        cache.clear()
+        anonymous, logged_in = BUDGETS[name]
+        with assert_max_queries(logged_in if authorized else anonymous):
+            if name in POST_DATA:
+                response = client.post(url, POST_DATA[name])
+            else:
+                response = client.get(url, url_query(name))
+        assert response.status_code == expected_status(name, authorized), (
+            f'{name}: ответ {response.status_code}'
+        )
@@ -0,0 +1,46 @@
+"""Сериализация постов в JSON прямо из словарей values().
+
+Модели не создаются: каждое поле ответа — колонка запроса, а URL
+картинки строится хранилищем по имени файла.
+"""
+from posts.models import Post
+
+# Поле ответа -> поле values().
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'image_color': 'image_color',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+image_storage = Post._meta.get_field('image').storage
+
+
+def post_values(queryset):
+    return queryset.values(*POST_FIELDS.values())
+
+
+def comment_values(queryset):
+    return queryset.values(*COMMENT_FIELDS.values())
+
+
+def serialize_post(row):
+    data = {name: row[field] for name, field in POST_FIELDS.items()}
+    data['image'] = image_storage.url(data['image']) if data['image'] else None
+    return data
+
+
+def serialize_comment(row):
+    return {name: row[field] for name, field in COMMENT_FIELDS.items()}
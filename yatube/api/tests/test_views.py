@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.conf import NUMBER_OF_POSTED
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Автор API')
+        cls.group = Group.objects.create(
+            title='Группа API', slug='api', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {index}')
+            for index in range(NUMBER_OF_POSTED + 3)
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Свежий пост'
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ответ')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_walk_by_cursor(self):
+        """Ленты отдаются страницами по курсору до самого конца"""
+        urls = [
+            reverse('api:posts'),
+            reverse('api:group_posts', kwargs={'slug': 'api'}),
+            reverse('api:user_posts', kwargs={'username': 'Автор API'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), NUMBER_OF_POSTED)
+                self.assertIsNone(data['previous'])
+                first = data['results'][0]
+                self.assertEqual(first['id'], self.post.pk)
+                self.assertEqual(first['author'], 'Автор API')
+                self.assertEqual(first['group'], 'api')
+                self.assertIsNone(first['image'])
+                data = self.client.get(data['next']).json()
+                self.assertEqual(len(data['results']), 4)
+                self.assertIsNone(data['next'])
+                self.assertIsNotNone(data['previous'])
+
+    def test_bad_cursor_gives_first_page(self):
+        """Битый курсор и курсор из null — первая страница, а не 500"""
+        for cursor in ('garbage', 'WzAsW251bGwsbnVsbF1d'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    reverse('api:posts'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()['results'][0]['id'], self.post.pk
+                )
+
+    def test_feed_is_one_query(self):
+        """Лента — один запрос values(), без моделей на пост"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api:posts'))
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+
+    def test_post_detail(self):
+        """Пост отдаётся вместе с комментариями"""
+        data = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(data['text'], 'Свежий пост')
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['comments'][0]['text'], 'Ответ')
+
+    def test_not_found_is_json(self):
+        """Неизвестные группа, автор и пост — 404 в JSON"""
+        urls = [
+            reverse('api:group_posts', kwargs={'slug': 'missing'}),
+            reverse('api:user_posts', kwargs={'username': 'missing'}),
+            reverse('api:post_detail', kwargs={'post_id': 10 ** 6}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_etags(self):
+        """ETag не зависит от пользователя и меняется с данными"""
+        urls = [
+            reverse('api:posts'),
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.client.force_login(self.user)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.client.logout()
+        Comment.objects.create(post=self.post, author=self.user, text='Ещё')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,91 @@
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from posts.cache import versioned_cache_page
+from posts.conditions import feed_condition, public_post_condition
+from posts.conf import NUMBER_OF_POSTED, PAGE_CACHE_TIMEOUT
+from posts.models import Comment, Group, Post
+from posts.utils import CursorPaginator
+
+from .serializers import (comment_values, post_values, serialize_comment,
+                          serialize_post)
+
+User = get_user_model()
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def json_not_found(view):
+    """404 ответом JSON, а не HTML страницей сайта."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response({'detail': 'Не найдено.'}, status=404)
+    return wrapper
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    return f'{request.path}?{urlencode({"cursor": cursor})}'
+
+
+def feed_page(request, queryset):
+    """Страница ленты курсором: results и ссылки на соседние страницы."""
+    paginator = CursorPaginator(post_values(queryset), NUMBER_OF_POSTED)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': [serialize_post(row) for row in page],
+        'next': _link(request, page.next_cursor),
+        'previous': _link(request, page.previous_cursor),
+    })
+
+
+@feed_condition('index', per_user=False)
+@versioned_cache_page(PAGE_CACHE_TIMEOUT, 'index', per_user=False)
+def posts(request):
+    return feed_page(request, Post.objects.all())
+
+
+@feed_condition('group:{slug}', per_user=False)
+@versioned_cache_page(
+    PAGE_CACHE_TIMEOUT, 'group:{slug}', per_user=False
+)
+@json_not_found
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_page(request, Post.objects.filter(group=group))
+
+
+@feed_condition('profile:{username}', per_user=False)
+@versioned_cache_page(
+    PAGE_CACHE_TIMEOUT, 'profile:{username}', per_user=False
+)
+@json_not_found
+def user_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_page(request, Post.objects.filter(author=author))
+
+
+@public_post_condition
+@json_not_found
+def post_detail(request, post_id):
+    row = post_values(Post.objects.filter(pk=post_id)).first()
+    if row is None:
+        raise Http404
+    comments = comment_values(
+        Comment.objects.filter(post_id=post_id).order_by('created')
+    )
+    data = serialize_post(row)
+    data['comments'] = [serialize_comment(row) for row in comments]
+    return json_response(data)
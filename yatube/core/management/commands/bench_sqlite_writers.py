@@ -0,0 +1,153 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sqlite import RETRY_ATTEMPTS, backoff, is_busy, pragma_statements
+
+MODES = ('default', 'tuned')
+POSTS = 100
+# Таймаут, с которым sqlite3.connect открывает базу и для Django.
+DEFAULT_TIMEOUT = 5.0
+
+
+def setup(path, tuned):
+    connection = sqlite3.connect(path, isolation_level=None)
+    if tuned:
+        for statement in pragma_statements():
+            connection.execute(statement)
+    connection.executescript(
+        'CREATE TABLE post ('
+        '    id INTEGER PRIMARY KEY, comments_count INTEGER NOT NULL);'
+        'CREATE TABLE comment ('
+        '    id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        '    post_id INTEGER NOT NULL REFERENCES post (id),'
+        '    text TEXT NOT NULL, created REAL NOT NULL);'
+    )
+    connection.executemany(
+        'INSERT INTO post (id, comments_count) VALUES (?, 0)',
+        [(pk,) for pk in range(1, POSTS + 1)]
+    )
+    connection.close()
+
+
+def add_comment(connection, post_id):
+    """Та же последовательность, что у add_comment: чтение, потом запись."""
+    connection.execute('BEGIN')
+    try:
+        connection.execute(
+            'SELECT id FROM post WHERE id = ?', (post_id,)
+        ).fetchone()
+        connection.execute(
+            'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+            (post_id, 'Комментарий', time.time())
+        )
+        connection.execute(
+            'UPDATE post SET comments_count = comments_count + 1 '
+            'WHERE id = ?', (post_id,)
+        )
+        connection.execute('COMMIT')
+    except sqlite3.OperationalError:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+
+
+def writer(path, tuned, writes):
+    """Один процесс-писатель: (записано, ошибок, повторов, задержки)."""
+    connection = sqlite3.connect(
+        path, timeout=DEFAULT_TIMEOUT, isolation_level=None
+    )
+    if tuned:
+        for statement in pragma_statements():
+            connection.execute(statement)
+    done = errors = retries = 0
+    latencies = []
+    for _ in range(writes):
+        post_id = random.randint(1, POSTS)
+        started = time.perf_counter()
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            try:
+                add_comment(connection, post_id)
+            except sqlite3.OperationalError as error:
+                if not (tuned and is_busy(error)) or (
+                    attempt == RETRY_ATTEMPTS
+                ):
+                    errors += 1
+                    break
+                retries += 1
+                time.sleep(backoff(attempt))
+            else:
+                done += 1
+                latencies.append(time.perf_counter() - started)
+                break
+    connection.close()
+    return done, errors, retries, latencies
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентных писателей SQLite с настройками по '
+        'умолчанию и с WAL, прагмами и повтором записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', type=int, default=8,
+            help='Процессов, пишущих одновременно.'
+        )
+        parser.add_argument(
+            '--writes', type=int, default=200,
+            help='Комментариев от каждого писателя.'
+        )
+        parser.add_argument(
+            '--mode', choices=MODES + ('both',), default='both',
+            help='Какой режим измерять.'
+        )
+
+    def handle(self, *args, **options):
+        writers, writes = options['writers'], options['writes']
+        if writers < 1 or writes < 1:
+            raise CommandError('Число писателей и записей должно быть '
+                               'положительным.')
+        modes = MODES if options['mode'] == 'both' else (options['mode'],)
+        with tempfile.TemporaryDirectory() as directory:
+            for mode in modes:
+                path = os.path.join(directory, f'{mode}.sqlite3')
+                self.run(mode, path, writers, writes)
+
+    def run(self, mode, path, writers, writes):
+        tuned = mode == 'tuned'
+        setup(path, tuned)
+        started = time.perf_counter()
+        with Pool(writers) as pool:
+            results = pool.starmap(
+                writer, [(path, tuned, writes)] * writers
+            )
+        elapsed = time.perf_counter() - started
+        done = sum(result[0] for result in results)
+        errors = sum(result[1] for result in results)
+        retries = sum(result[2] for result in results)
+        latencies = [
+            latency for result in results for latency in result[3]
+        ]
+        median = statistics.median(latencies) if latencies else 0
+        self.stdout.write(
+            f'{mode}: записано {done} из {writers * writes} за '
+            f'{elapsed:.2f} с, {done / elapsed:.0f} записей/с, '
+            f'ошибок {errors}, повторов {retries}, '
+            f'p50 {median * 1000:.1f} мс, '
+            f'p99 {percentile(latencies, 0.99) * 1000:.1f} мс'
+        )
@@ -0,0 +1,8 @@
+"""Сессии в базе, запись которых переживает занятый SQLite."""
+from django.contrib.sessions.backends import db
+
+from .sqlite import retry_on_busy
+
+
+class SessionStore(db.SessionStore):
+    save = retry_on_busy(db.SessionStore.save)
@@ -0,0 +1,80 @@
+"""SQLite в режиме для сайта: WAL, прагмы соединения и повтор записи.
+
+В WAL читатели не ждут писателя, а synchronous=NORMAL не делает fsync
+на каждый коммит. busy_timeout заставляет ждать чужую блокировку, но
+SQLite не ждёт, если транзакция уже читала и снимок устарел: такая
+запись сразу получает «database is locked». retry_on_busy повторяет её
+целиком в новой транзакции с растущей случайной паузой.
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+
+# Порядок важен: busy_timeout нужен уже для переключения журнала.
+PRAGMAS = getattr(settings, 'SQLITE_PRAGMAS', {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 ** 2,
+    # Отрицательное значение — размер в КиБ, а не в страницах.
+    'cache_size': -20000,
+})
+RETRY_ATTEMPTS = getattr(settings, 'SQLITE_RETRY_ATTEMPTS', 5)
+RETRY_DELAY = getattr(settings, 'SQLITE_RETRY_DELAY', 0.02)
+
+BUSY_MESSAGES = ('database is locked', 'database is busy')
+
+
+def pragma_statements(in_memory=False):
+    """PRAGMA для нового соединения; у базы в памяти нет WAL."""
+    return [
+        f'PRAGMA {name} = {value}'
+        for name, value in PRAGMAS.items()
+        if not (in_memory and name == 'journal_mode')
+    ]
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: прагмы каждому соединению SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(connection.is_in_memory_db()):
+            cursor.execute(statement)
+
+
+def is_busy(error):
+    message = str(error)
+    return any(busy in message for busy in BUSY_MESSAGES)
+
+
+def backoff(attempt, delay=RETRY_DELAY):
+    """Пауза перед попыткой attempt + 1: вдвое дольше, со случайным
+    разбросом, чтобы писатели не просыпались одновременно."""
+    return delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+def retry_on_busy(func):
+    """Выполняет func в транзакции и повторяет, пока база занята.
+
+    Внутри чужой транзакции повторять нечего: откатится она целиком,
+    поэтому там func просто вызывается.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            return func(*args, **kwargs)
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if attempt == RETRY_ATTEMPTS or not is_busy(error):
+                    raise
+            time.sleep(backoff(attempt))
+    return wrapper
@@ -0,0 +1,65 @@
+from contextlib import ContextDecorator, contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class assert_max_queries(ContextDecorator):
+    """Бюджет SQL запросов для блока кода или тестовой функции.
+
+    Работает как контекстный менеджер и как декоратор:
+
+        with assert_max_queries(3):
+            client.get('/')
+
+        @assert_max_queries(3)
+        def test_index(...):
+            ...
+    """
+
+    def __init__(self, max_queries, using=DEFAULT_DB_ALIAS):
+        self.max_queries = max_queries
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        return self.context.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        executed = len(self.context)
+        if executed > self.max_queries:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(
+                    self.context.captured_queries, start=1
+                )
+            )
+            raise AssertionError(
+                f'Выполнено {executed} SQL запросов, '
+                f'бюджет {self.max_queries}:\n{queries}'
+            )
+        return False
+
+
+@contextmanager
+def capture_on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=False):
+    """Колбэки transaction.on_commit, заведённые в блоке.
+
+    TestCase не коммитит, и колбэки в нём не вызываются; execute=True
+    выполняет их при выходе из блока, как после коммита. Замена
+    TestCase.captureOnCommitCallbacks из Django 3.2.
+    """
+    callbacks = []
+    start = len(connections[using].run_on_commit)
+    try:
+        yield callbacks
+    finally:
+        callbacks[:] = [
+            func for _, func in connections[using].run_on_commit[start:]
+        ]
+        if execute:
+            for callback in callbacks:
+                callback()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, TransactionTestCase
+
+from core import sqlite
+from posts import autocomplete
+from posts.cache import PAGES_SCOPE, get_version
+from posts.models import Group
+
+# Без пауз между попытками.
+no_sleep = mock.patch('core.sqlite.time', mock.Mock())
+
+
+class PragmasTest(TestCase):
+    def test_connection_gets_pragmas(self):
+        """Каждое соединение получает busy_timeout, synchronous, кэш."""
+        with connection.cursor() as cursor:
+            values = {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('busy_timeout', 'synchronous', 'cache_size')
+            }
+        self.assertEqual(values, {
+            'busy_timeout': 5000,
+            # NORMAL
+            'synchronous': 1,
+            'cache_size': -20000,
+        })
+
+    def test_in_memory_database_keeps_journal(self):
+        """Базе в памяти WAL не переключают."""
+        statements = sqlite.pragma_statements(in_memory=True)
+        self.assertFalse(
+            [statement for statement in statements if 'journal' in statement]
+        )
+
+    def test_file_database_switches_to_wal(self):
+        """База в файле переходит в WAL при первом соединении."""
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = dict(
+                connection.settings_dict,
+                NAME=os.path.join(directory, 'db.sqlite3')
+            )
+            wrapper = DatabaseWrapper(settings_dict, alias='wal')
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+            finally:
+                wrapper.close()
+
+
+@no_sleep
+class RetryOnBusyTest(TransactionTestCase):
+    def flaky(self, failures, error='database is locked'):
+        """Функция, которая failures раз падает с error."""
+        calls = []
+
+        @sqlite.retry_on_busy
+        def write():
+            calls.append(1)
+            Group.objects.create(
+                title='Группа', slug=f'group-{len(calls)}', description=''
+            )
+            if len(calls) <= failures:
+                raise OperationalError(error)
+            return 'готово'
+        return write, calls
+
+    def test_retries_until_success(self):
+        """Занятая база — повтор; записи неудачных попыток откатываются."""
+        write, calls = self.flaky(2)
+        self.assertEqual(write(), 'готово')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(
+            list(Group.objects.values_list('slug', flat=True)), ['group-3']
+        )
+
+    def test_gives_up_after_attempts(self):
+        write, calls = self.flaky(sqlite.RETRY_ATTEMPTS)
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), sqlite.RETRY_ATTEMPTS)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(autocomplete.index.search('group'), [])
+
+    def test_versions_move_after_commit(self):
+        """Версии страниц сдвигаются после коммита, а не до него"""
+        cache.clear()
+        version = get_version(PAGES_SCOPE)
+        versions = []
+        write, _ = self.flaky(0)
+
+        @sqlite.retry_on_busy
+        def write_and_look():
+            write()
+            versions.append(get_version(PAGES_SCOPE))
+
+        write_and_look()
+        self.assertEqual(versions, [version])
+        self.assertNotEqual(get_version(PAGES_SCOPE), version)
+
+    def test_other_errors_are_not_retried(self):
+        write, calls = self.flaky(1, error='no such table: posts_group')
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+    def test_no_retry_inside_transaction(self):
+        """Во внешней транзакции повтор ничего не спасёт."""
+        write, calls = self.flaky(1)
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                write()
+        self.assertEqual(len(calls), 1)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, Group, Post
+from .models import Comment, Group, Post, ThumbnailJob
+from .search import expression, matching
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексу FTS5 вместо LIKE '%...%' по всей таблице.
+        if not search_term.strip():
+            return queryset, False
+        if not expression(search_term):
+            return queryset.none(), False
+        return queryset.filter(pk__in=matching(search_term)), False
+
 
 admin.site.register(Post, PostAdmin)
 
@@ -31,3 +40,12 @@ class CommentAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Comment, CommentAdmin)
+
+
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    list_display = ('image', 'status', 'attempts', 'updated')
+    search_fields = ('image',)
+    list_filter = ('status',)
+
+
+admin.site.register(ThumbnailJob, ThumbnailJobAdmin)
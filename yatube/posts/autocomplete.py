@@ -0,0 +1,127 @@
+"""Подсказки по началу имени пользователя, названия или slug группы.
+
+Индекс — отсортированный список ключей в памяти процесса: префикс
+ищется bisect, без запросов к базе. Сигналы правят его на месте, а
+другие процессы узнают о правке по версии области 'autocomplete' и
+перестраивают свой индекс целиком. Версию видно, только если кэш общий
+для процессов, поэтому индекс старше AUTOCOMPLETE_MAX_AGE секунд
+перестраивается в любом случае.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.contrib.auth import get_user_model
+
+from .cache import bump_version, get_version
+from .conf import AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_AGE
+from .models import Group
+
+SCOPE = 'autocomplete'
+GROUP = 'group'
+USER = 'user'
+
+
+def group_entry(pk, title, slug):
+    words = re.findall(r'\w+', title)
+    keys = {title, slug, *words}
+    return keys, {'type': GROUP, 'id': pk, 'title': title, 'slug': slug}
+
+
+def user_entry(pk, username):
+    return {username}, {'type': USER, 'id': pk, 'username': username}
+
+
+class PrefixIndex:
+    """Отсортированные (ключ, id) по видам и описания записей по (вид, id)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.built = 0
+        self.keys = {GROUP: [], USER: []}
+        self.entries = {}
+
+    def _put(self, kind, pk, keys, payload):
+        self._remove(kind, pk)
+        self.entries[kind, pk] = (keys, payload)
+        for key in {key.casefold() for key in keys}:
+            insort(self.keys[kind], (key, pk))
+
+    def _remove(self, kind, pk):
+        keys, _ = self.entries.pop((kind, pk), (set(), None))
+        items = self.keys[kind]
+        for key in {key.casefold() for key in keys}:
+            index = bisect_left(items, (key, pk))
+            if index < len(items) and items[index] == (key, pk):
+                del items[index]
+
+    def _build(self, version):
+        self.keys = {GROUP: [], USER: []}
+        self.entries = {}
+        groups = Group.objects.values_list('pk', 'title', 'slug')
+        for pk, title, slug in groups.iterator():
+            self._put(GROUP, pk, *group_entry(pk, title, slug))
+        users = get_user_model().objects.values_list('pk', 'username')
+        for pk, username in users.iterator():
+            self._put(USER, pk, *user_entry(pk, username))
+        self.version = version
+        self.built = time.monotonic()
+
+    def _scan(self, kind, prefix, limit):
+        items = self.keys[kind]
+        found = {}
+        index = bisect_left(items, (prefix,))
+        while index < len(items) and len(found) < limit:
+            key, pk = items[index]
+            if not key.startswith(prefix):
+                break
+            found.setdefault(pk, key)
+            index += 1
+        return [(key, kind, pk) for pk, key in found.items()]
+
+    def search(self, prefix, kind=None, limit=AUTOCOMPLETE_LIMIT):
+        """До limit записей, у которых есть ключ с началом prefix."""
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return []
+        kinds = [kind] if kind else list(self.keys)
+        version = get_version(SCOPE)
+        with self.lock:
+            age = time.monotonic() - self.built
+            if version != self.version or age > AUTOCOMPLETE_MAX_AGE:
+                self._build(version)
+            found = sorted(
+                item for each in kinds
+                for item in self._scan(each, prefix, limit)
+            )[:limit]
+            return [self.entries[kind, pk][1] for _, kind, pk in found]
+
+    def update(self, kind, pk, entry=None):
+        """Правит запись на месте; entry=None — удаляет её.
+
+        Версия сдвигается, только если запись изменилась или индекс
+        процесса ещё не построен, чтобы вход пользователя (сохранение
+        last_login) не заставлял остальные процессы перестраиваться.
+        """
+        with self.lock:
+            if self.version is not None and self.version != get_version(
+                SCOPE
+            ):
+                # Индекс отстал от другого процесса: правка на месте
+                # скрыла бы это, пусть лучше перестроится при поиске.
+                self.version = None
+            current = self.entries.get((kind, pk))
+            if self.version is not None and current == entry:
+                return
+            if entry is None:
+                self._remove(kind, pk)
+            else:
+                self._put(kind, pk, *entry)
+            version = bump_version(SCOPE)
+            if self.version is not None:
+                self.version = version
+
+
+index = PrefixIndex()
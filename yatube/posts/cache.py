@@ -0,0 +1,115 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_page
+
+from .conf import VERSION_CACHE_TIMEOUT
+from .models import Post
+
+VERSION_KEY = 'posts:version:{}'
+# Версия, общая для всех закэшированных страниц ленты.
+PAGES_SCOPE = 'pages'
+
+
+def get_version(scope):
+    """Текущая версия данных области; сбрасывается через bump_version."""
+    return get_versions(scope)[scope]
+
+
+def version_key(scope):
+    # В области бывают имена пользователей: кириллица и пробелы в ключах
+    # memcached недопустимы.
+    return VERSION_KEY.format(hashlib.md5(scope.encode()).hexdigest())
+
+
+def get_versions(*scopes):
+    """Версии нескольких областей за одно обращение к кэшу."""
+    keys = {version_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    missing = [scope for scope in scopes if scope not in versions]
+    if missing:
+        versions.update(dict.fromkeys(missing, bump_version(*missing)))
+    return versions
+
+
+def bump_version(*scopes):
+    """Сбрасывает версии областей и возвращает новую версию."""
+    version = time.time()
+    cache.set_many(
+        {version_key(scope): version for scope in scopes},
+        VERSION_CACHE_TIMEOUT
+    )
+    return version
+
+
+def bump_version_on_commit(*scopes):
+    """bump_version после коммита текущей транзакции.
+
+    Сброс до коммита даёт читателю построить страницу по старым данным
+    и сохранить её под уже новой версией: она устареет до следующей
+    записи. Вне транзакции версии сбрасываются сразу.
+    """
+    transaction.on_commit(lambda: bump_version(*scopes))
+
+
+def post_scopes(*post_ids):
+    """Области страниц, на которых показаны посты: лента, группа, автор."""
+    rows = Post.objects.filter(pk__in=post_ids).values_list(
+        'group__slug', 'author__username'
+    )
+    scopes = {'index'} if post_ids else set()
+    for slug, username in rows:
+        scopes.add(f'profile:{username}')
+        if slug is not None:
+            scopes.add(f'group:{slug}')
+    return scopes
+
+
+def profile_scopes(*user_ids):
+    """Области страниц профилей пользователей."""
+    usernames = get_user_model().objects.filter(
+        pk__in=user_ids
+    ).values_list('username', flat=True)
+    return {f'profile:{username}' for username in usernames}
+
+
+def versioned_cache_page(timeout, *scopes, per_user=True):
+    """cache_page, ключ которого меняется вместе с версиями областей.
+
+    Области могут ссылаться на аргументы адреса: 'group:{slug}'. Запись
+    в области сбрасывает её версию, и страница строится заново, поэтому
+    timeout ограничивает только жизнь ключей, до которых никто не дойдёт.
+    Браузеру же страница отдаётся без срока годности: он переспрашивает
+    её каждый раз, а условный GET отвечает 304, пока версии не сдвинулись.
+
+    cache_page сохраняет ответ раньше, чем SessionMiddleware добавит
+    Vary: Cookie, поэтому страница авторизованного хранится под ключом
+    с его id, как и в ETag feed_condition. per_user=False — для ответов,
+    одинаковых для всех.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            names = [PAGES_SCOPE] + [
+                scope.format(**kwargs) for scope in scopes
+            ]
+            versions = get_versions(*names)
+            parts = [f'{name}={versions[name]}' for name in names]
+            if per_user and request.user.is_authenticated:
+                parts.append(f'user={request.user.pk}')
+            prefix = hashlib.md5(' '.join(parts).encode()).hexdigest()
+            cached_view = cache_page(timeout, key_prefix=prefix)(view)
+            response = cached_view(request, *args, **kwargs)
+            # cache_page проставляет max-age в timeout, а он тут в часах.
+            patch_cache_control(response, max_age=0)
+            if response.has_header('Expires'):
+                del response['Expires']
+            return response
+        return wrapper
+    return decorator
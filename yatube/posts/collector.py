@@ -0,0 +1,102 @@
+"""Поиск файлов медиа, на которые больше ничего не ссылается.
+
+Хранилище обходится по каталогу за раз, а ссылки проверяются запросами
+IN не длиннее LOOKUP_CHUNK имён: в старом плоском каталоге posts/ лежат
+все прежние загрузки, и один запрос на него упёрся бы в предел
+параметров SQLite. В памяти не бывает больше одного каталога, сколько
+бы ни было постов.
+"""
+import datetime
+import os
+
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .conf import LOOKUP_CHUNK
+from .models import MediaBlob, Post, ThumbnailJob
+from .utils import chunked
+
+IMAGES_DIR = Post._meta.get_field('image').upload_to
+
+
+def image_storage():
+    return Post._meta.get_field('image').storage
+
+
+def walk(storage, top):
+    """Имена файлов под top, пачками из одного каталога."""
+    if not storage.exists(top):
+        return
+    directories, files = storage.listdir(top)
+    for chunk in chunked(files, LOOKUP_CHUNK):
+        yield [os.path.join(top, name) for name in chunk]
+    for directory in directories:
+        yield from walk(storage, os.path.join(top, directory))
+
+
+def _settled(storage, names, grace):
+    """Отбрасывает свежие файлы: их загрузка может быть ещё не сохранена."""
+    border = timezone.now() - datetime.timedelta(seconds=grace)
+    return [
+        name for name in names
+        if storage.get_modified_time(name) < border
+    ]
+
+
+def orphan_images(grace):
+    """Картинки постов, на которые не ссылается ни один пост."""
+    storage = image_storage()
+    for names in walk(storage, IMAGES_DIR):
+        referenced = set(Post.objects.filter(
+            image__in=names
+        ).values_list('image', flat=True).iterator())
+        orphans = [name for name in names if name not in referenced]
+        yield from _settled(storage, orphans, grace)
+
+
+def stray_thumbnails(grace):
+    """Файлы миниатюр, которых нет в kvstore sorl: их никто не покажет."""
+    storage = default.storage
+    for names in walk(storage, sorl_settings.THUMBNAIL_PREFIX.rstrip('/')):
+        keys = {
+            add_prefix(ImageFile(name, storage).key): name
+            for name in names
+        }
+        known = set(KVStoreModel.objects.filter(
+            key__in=keys
+        ).values_list('key', flat=True).iterator())
+        strays = [name for key, name in keys.items() if key not in known]
+        yield from _settled(storage, strays, grace)
+
+
+def is_orphan(name, grace):
+    """Последняя проверка перед удалением: пост мог появиться за обход.
+
+    Одинаковая загрузка переиспользует старый файл, не трогая его дату,
+    поэтому свежесть ссылки смотрим по MediaBlob.updated.
+    """
+    border = timezone.now() - datetime.timedelta(seconds=grace)
+    return not (
+        Post.objects.filter(image=name).exists()
+        or MediaBlob.objects.filter(name=name, updated__gte=border).exists()
+    )
+
+
+def thumbnails_of(name):
+    """Имена миниатюр картинки по записям kvstore."""
+    source = ImageFile(name, image_storage())
+    keys = default.kvstore._get(source.key, identity='thumbnails') or []
+    thumbnails = (default.kvstore._get(key) for key in keys)
+    return [thumbnail.name for thumbnail in thumbnails if thumbnail]
+
+
+def forget_image(name):
+    """Убирает учёт картинки: kvstore с миниатюрами, задание, счётчик."""
+    default.kvstore.delete(ImageFile(name, image_storage()))
+    ThumbnailJob.objects.filter(image=name).delete()
+    # Посты на файл не ссылаются: ненулевой счётчик — расхождение.
+    MediaBlob.objects.filter(name=name).delete()
@@ -0,0 +1,70 @@
+"""Валидаторы условных GET для страниц лент и поста.
+
+Лентам хватает версий областей кэша: их сдвигают те же сигналы, что
+сбрасывают закэшированные страницы, и читаются они одним get_many без
+SQL. Страница поста проверяется одним запросом по первичному ключу.
+"""
+import datetime
+import hashlib
+import math
+import time
+from functools import partial
+
+from django.views.decorators.http import condition
+
+from .cache import PAGES_SCOPE, get_versions
+from .models import Post
+
+
+def _feed_versions(request, scopes, kwargs):
+    # etag_func и last_modified_func зовутся по очереди: читаем кэш раз.
+    if not hasattr(request, '_feed_versions'):
+        names = [PAGES_SCOPE] + [scope.format(**kwargs) for scope in scopes]
+        request._feed_versions = get_versions(*names)
+    return request._feed_versions
+
+
+def _etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def feed_condition(*scopes, per_user=True):
+    """condition() для страницы ленты по версиям её областей.
+
+    Страница авторизованного зависит и от него самого, поэтому его id
+    входит в ETag, а Last-Modified ему не отдаётся. per_user=False —
+    для ответов, одинаковых для всех, как в API.
+    """
+    def etag(request, *args, **kwargs):
+        versions = _feed_versions(request, scopes, kwargs)
+        user = request.user.pk if per_user else None
+        return _etag(user, sorted(versions.items()))
+
+    def last_modified(request, *args, **kwargs):
+        if per_user and request.user.is_authenticated:
+            return None
+        latest = max(_feed_versions(request, scopes, kwargs).values())
+        if time.time() < math.ceil(latest):
+            # Last-Modified точен до секунды: правку в ту же секунду
+            # по нему не отличить, и опрос с If-Modified-Since получил бы
+            # 304 на устаревшую страницу.
+            return None
+        return datetime.datetime.fromtimestamp(latest, datetime.timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def post_etag(request, post_id, per_user=True):
+    """Пост меняется с updated_at, комментариями и счётчиком постов автора."""
+    state = Post.objects.filter(pk=post_id).values_list(
+        'updated_at', 'comments_count', 'author__stats__posts_count'
+    ).order_by().first()
+    if state is None:
+        return None
+    return _etag(request.user.pk if per_user else None, state)
+
+
+post_condition = condition(etag_func=post_etag)
+public_post_condition = condition(
+    etag_func=partial(post_etag, per_user=False)
+)
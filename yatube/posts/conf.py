@@ -1 +1,102 @@
+import os
+
+from django.conf import settings
+
+# Кэш процесса (LocMemCache) не видит версий, сброшенных другими
+# воркерами: с ним страницы, версии и счётчики живут недолго.
+LOCAL_CACHE = settings.CACHES['default']['BACKEND'].endswith('LocMemCache')
+LOCAL_CACHE_TIMEOUT = 20
+
 NUMBER_OF_POSTED = 10
+# Порядок ленты: ключ курсорной пагинации должен быть уникальным.
+FEED_ORDERING = ('-pub_date', '-id')
+# Окно номеров страниц: первая/последняя и по две вокруг текущей.
+PAGE_RANGE_ON_EACH_SIDE = 2
+PAGE_RANGE_ON_ENDS = 1
+# Сколько живёт закэшированный COUNT(*) ленты, если его не сбросили.
+COUNT_CACHE_TIMEOUT = LOCAL_CACHE_TIMEOUT if LOCAL_CACHE else 60 * 60
+# Лента подписок сортируется по колонкам Timeline, чтобы идти по индексу.
+TIMELINE_ORDERING = ('-timeline__pub_date', '-timeline__post')
+# Размер пачки INSERT при раскладке постов по лентам подписчиков.
+TIMELINE_BATCH_SIZE = 500
+# Движок ленты подписок: 'timeline' читает материализованную ленту,
+# 'merge' сливает срезы постов каждого автора, 'auto' выбирает merge,
+# пока подписок не больше FOLLOW_MERGE_MAX_AUTHORS.
+FOLLOW_FEED_ENGINE = getattr(settings, 'POSTS_FOLLOW_FEED_ENGINE', 'auto')
+FOLLOW_MERGE_MAX_AUTHORS = getattr(
+    settings, 'POSTS_FOLLOW_MERGE_MAX_AUTHORS', 50
+)
+# Страницы лент живут в кэше долго: свежесть держат версии областей.
+PAGE_CACHE_TIMEOUT = getattr(
+    settings, 'POSTS_PAGE_CACHE_TIMEOUT',
+    LOCAL_CACHE_TIMEOUT if LOCAL_CACHE else 60 * 60 * 6
+)
+# Версии в общем кэше бессрочны; в кэше процесса устаревают вместе со
+# страницами, иначе ETag чужого воркера отвечал бы 304 бесконечно.
+VERSION_CACHE_TIMEOUT = PAGE_CACHE_TIMEOUT if LOCAL_CACHE else None
+# Отрисованные карточки постов: ключ меняется вместе с updated_at.
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Варианты картинки поста для srcset: ширины кропа 960x339 в WebP
+# и JPEG. Последний формат — запасной для <img src> у старых браузеров.
+CARD_WIDTHS = getattr(settings, 'POSTS_CARD_WIDTHS', (480, 960, 1440))
+CARD_FORMATS = getattr(settings, 'POSTS_CARD_FORMATS', ('WEBP', 'JPEG'))
+CARD_FALLBACK_WIDTH = 960
+CARD_ASPECT = 339 / 960
+CARD_SIZES = '(min-width: 768px) 75vw, 100vw'
+CARD_VARIANTS = tuple(
+    (
+        f'{width}x{round(width * CARD_ASPECT)}',
+        {'crop': 'center', 'upscale': True, 'format': image_format},
+    )
+    for image_format in CARD_FORMATS
+    for width in CARD_WIDTHS
+)
+# Миниатюры, которые воркер собирает заранее: (геометрия, опции sorl).
+# Шаблоны просят те же геометрии, иначе читатель получит заглушку.
+THUMBNAIL_GEOMETRIES = CARD_VARIANTS
+THUMBNAIL_PLACEHOLDER = 'img/thumbnail-placeholder.svg'
+# Процессов в пуле воркера миниатюр; None — по числу ядер.
+THUMBNAIL_WORKERS = getattr(settings, 'POSTS_THUMBNAIL_WORKERS', None)
+THUMBNAIL_BATCH_SIZE = 50
+THUMBNAIL_MAX_ATTEMPTS = 3
+# Задание в работе дольше этого срока считается брошенным воркером.
+THUMBNAIL_JOB_TIMEOUT = 10 * 60
+# Пачка постов при досыпке сведений о картинках из хранилища.
+IMAGE_META_BATCH_SIZE = 200
+# Ограничения загружаемых картинок. Пиксели считаются по заголовку, до
+# декодирования: у анимаций — по всем кадрам вместе.
+IMAGE_MAX_BYTES = getattr(settings, 'POSTS_IMAGE_MAX_BYTES', 10 * 1024 ** 2)
+IMAGE_MAX_PIXELS = getattr(
+    settings, 'POSTS_IMAGE_MAX_PIXELS', 24 * 1000 * 1000
+)
+# MPO — JPEG с дополнительными кадрами, так снимают многие телефоны.
+IMAGE_FORMATS = ('JPEG', 'MPO', 'PNG', 'GIF', 'WEBP')
+# Картинка перекодируется и ужимается до этой стороны перед сохранением.
+IMAGE_MAX_SIDE = getattr(settings, 'POSTS_IMAGE_MAX_SIDE', 2560)
+IMAGE_QUALITY = 85
+# Сборщик осиротевших картинок и миниатюр: файлы моложе MEDIA_GC_GRACE
+# не трогаются, действий в секунду не больше MEDIA_GC_RATE. Без --delete
+# картинки переносятся в MEDIA_QUARANTINE_ROOT, вне раздаваемого MEDIA_ROOT.
+MEDIA_GC_GRACE = 60 * 60
+MEDIA_GC_RATE = 20
+MEDIA_QUARANTINE_ROOT = getattr(
+    settings,
+    'POSTS_MEDIA_QUARANTINE_ROOT',
+    os.path.join(settings.BASE_DIR, 'media_quarantine')
+)
+# Поиск: слов запроса сверх этого числа FTS5 не получит.
+SEARCH_MAX_WORDS = 10
+# Подсказок в ответе автодополнения не больше этого числа.
+AUTOCOMPLETE_LIMIT = 10
+# Индекс подсказок процесса перестраивается не реже этого, даже если
+# версию области не видно: кэш может быть у каждого процесса свой.
+AUTOCOMPLETE_MAX_AGE = getattr(settings, 'POSTS_AUTOCOMPLETE_MAX_AGE', 60)
+# Запрос IN не длиннее этого: старые сборки SQLite держат 999 параметров.
+LOOKUP_CHUNK = 500
+# Импорт постов: строк в одном bulk_create и пачек в одной транзакции.
+IMPORT_BATCH_SIZE = getattr(settings, 'POSTS_IMPORT_BATCH_SIZE', 1000)
+IMPORT_TRANSACTION_BATCHES = 10
+# Выгрузка читает строки из базы пачками такого размера.
+EXPORT_CHUNK_SIZE = 2000
+# Записей в RSS и Atom лентах.
+SYNDICATION_ITEMS = 20
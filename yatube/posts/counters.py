@@ -0,0 +1,92 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Сигналы сдвигают счётчики на единицу UPDATE ... SET x = x + 1, а
+строка AuthorStats создаётся лениво при первом чтении точным подсчётом.
+Расхождения после массовых операций чинит команда reconcile_counters.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F
+
+from .models import AuthorStats, Follow, Post
+
+User = get_user_model()
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        # Счётчики беззнаковые: уход в минус оставляем reconcile.
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def bump_author(user_id, field, delta):
+    _bump(AuthorStats.objects.filter(user_id=user_id), field, delta)
+
+
+def bump_comments(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def count_for(user):
+    return {
+        'posts_count': Post.objects.filter(author=user).count(),
+        'followers_count': Follow.objects.filter(author=user).count(),
+        'following_count': Follow.objects.filter(user=user).count(),
+    }
+
+
+def get_stats(user):
+    """Счётчики автора одним запросом по первичному ключу."""
+    try:
+        return AuthorStats.objects.get(user=user)
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            user=user, defaults=count_for(user)
+        )
+        return stats
+
+
+def _totals(queryset, field):
+    return dict(
+        queryset.values(field).annotate(total=Count('pk')).values_list(
+            field, 'total'
+        )
+    )
+
+
+def recount_posts(*user_ids):
+    """Пересчитывает posts_count авторов после вставки мимо сигналов."""
+    for chunk in range(0, len(user_ids), 500):
+        ids = user_ids[chunk:chunk + 500]
+        totals = _totals(
+            Post.objects.filter(author_id__in=ids).order_by(), 'author'
+        )
+        for user_id in ids:
+            AuthorStats.objects.filter(user_id=user_id).update(
+                posts_count=totals.get(user_id, 0)
+            )
+
+
+def reconcile():
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+    posts = _totals(Post.objects.order_by(), 'author')
+    followers = _totals(Follow.objects.order_by(), 'author')
+    following = _totals(Follow.objects.order_by(), 'user')
+    fixed = 0
+    for stats in AuthorStats.objects.iterator():
+        expected = {
+            'posts_count': posts.get(stats.user_id, 0),
+            'followers_count': followers.get(stats.user_id, 0),
+            'following_count': following.get(stats.user_id, 0),
+        }
+        actual = {field: getattr(stats, field) for field in expected}
+        if actual != expected:
+            AuthorStats.objects.filter(pk=stats.pk).update(**expected)
+            fixed += 1
+    drifted = Post.objects.order_by().annotate(
+        total=Count('comments')
+    ).exclude(comments_count=F('total'))
+    for pk, total in drifted.values_list('pk', 'total').iterator():
+        Post.objects.filter(pk=pk).update(comments_count=total)
+        fixed += 1
+    return fixed
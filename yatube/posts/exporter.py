@@ -0,0 +1,78 @@
+"""Потоковая выгрузка постов и комментариев пользователя.
+
+Строки читаются values_list(...).iterator(chunk_size): в памяти не
+больше пачки, сколько бы постов ни было у автора. Посты выгружаются
+с полями import_posts, так что выгрузку можно загрузить обратно.
+"""
+import csv
+import json
+
+from .conf import EXPORT_CHUNK_SIZE, FEED_ORDERING
+from .models import Comment, Post
+
+FORMATS = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _posts(user):
+    return Post.objects.filter(author=user).order_by(*FEED_ORDERING)
+
+
+def _comments(user):
+    # Порядок по id совпадает с порядком индекса по author_id.
+    return Comment.objects.filter(author=user).order_by('pk')
+
+
+# Вид выгрузки: (столбцы, queryset пользователя, поля values_list).
+KINDS = {
+    'posts': (
+        ('id', 'text', 'author', 'group', 'pub_date', 'image',
+         'comments_count'),
+        _posts,
+        ('pk', 'text', 'author__username', 'group__slug', 'pub_date',
+         'image', 'comments_count'),
+    ),
+    'comments': (
+        ('id', 'post', 'author', 'text', 'created'),
+        _comments,
+        ('pk', 'post_id', 'author__username', 'text', 'created'),
+    ),
+}
+
+
+def rows(user, kind):
+    """Строки выгрузки кортежами в порядке столбцов KINDS[kind]."""
+    _, queryset, fields = KINDS[kind]
+    return queryset(user).values_list(*fields).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+
+
+class Echo:
+    """Файл для csv.writer, который просто возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+def lines(user, kind, file_format):
+    """Строки файла выгрузки; для CSV первой идёт шапка."""
+    columns = KINDS[kind][0]
+    if file_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows(user, kind):
+            yield writer.writerow([_value(value) for value in row])
+        return
+    for row in rows(user, kind):
+        yield json.dumps(
+            dict(zip(columns, row)), ensure_ascii=False, default=_value
+        ) + '\n'
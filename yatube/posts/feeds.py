@@ -0,0 +1,115 @@
+"""RSS и Atom ленты сайта, группы и автора.
+
+Ленты кэшируются под теми же версиями областей, что и HTML страницы,
+а Last-Modified берётся из этих версий: опрос без изменений получает
+304, не доходя ни до кэша страницы, ни до базы.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .cache import versioned_cache_page
+from .conditions import feed_condition
+from .conf import PAGE_CACHE_TIMEOUT, SYNDICATION_ITEMS
+from .models import Group, Post
+
+User = get_user_model()
+
+
+class PostFeed(Feed):
+    """Общая часть лент: посты как элементы."""
+
+    def subtitle(self, obj=None):
+        # Atom пишет subtitle, а не description.
+        description = self.description
+        return description(obj) if callable(description) else description
+
+    def item_title(self, item):
+        return Truncator(item.text).words(10)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.pk})
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def _items(self, posts):
+        return posts.for_feed()[:SYNDICATION_ITEMS]
+
+
+class IndexFeed(PostFeed):
+    title = 'Yatube: последние записи'
+    description = 'Последние записи на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return self._items(Post.objects.all())
+
+
+class GroupFeed(PostFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', kwargs={'slug': group.slug})
+
+    def items(self, group):
+        return self._items(group.posts.all())
+
+
+class ProfileFeed(PostFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: записи {author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', kwargs={'username': author.username})
+
+    def items(self, author):
+        return self._items(author.posts.all())
+
+
+def feed_view(feed, scope):
+    """Лента под версиями области scope, как страница под cache_page."""
+    def view(request, *args, **kwargs):
+        response = feed(request, *args, **kwargs)
+        # Feed ставит Last-Modified по самому свежему посту; ставим по
+        # версиям, как и валидатор, иначе If-Modified-Since не совпадёт.
+        del response['Last-Modified']
+        return response
+    cached = versioned_cache_page(
+        PAGE_CACHE_TIMEOUT, scope, per_user=False
+    )(view)
+    return feed_condition(scope, per_user=False)(cached)
+
+
+def atom(feed_class):
+    """Та же лента в формате Atom."""
+    return type(
+        f'Atom{feed_class.__name__}', (feed_class,), {'feed_type': Atom1Feed}
+    )
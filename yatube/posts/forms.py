@@ -1,9 +1,61 @@
+from urllib.parse import urlencode
+
 from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import Select, Textarea
+from django.urls import reverse
+from PIL import Image
 
+from . import autocomplete, images
+from .conf import IMAGE_MAX_BYTES
 from .models import Comment, Post
 
 
+class AutocompleteSelect(Select):
+    """Select, в разметке которого только пустой и выбранный варианты.
+
+    Остальные варианты подсказывает автодополнение, так что форма
+    не выбирает из базы и не отдаёт браузеру всю таблицу.
+    """
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = '?'.join((
+            reverse('posts:autocomplete'), urlencode({'type': self.kind})
+        ))
+        return context
+
+    def selected_choices(self, value):
+        field = self.choices.field
+        choices = []
+        if field.empty_label is not None:
+            choices.append(('', field.empty_label))
+        selected = [item for item in value if item]
+        if selected:
+            try:
+                objects = list(self.choices.queryset.filter(pk__in=selected))
+            except (TypeError, ValueError, ValidationError):
+                objects = []
+            choices.extend(self.choices.choice(obj) for obj in objects)
+        return choices
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        self.choices = self.selected_choices(value)
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
@@ -16,6 +68,16 @@ class PostForm(forms.ModelForm):
             'text': 'Текст нового поста',
             'group': 'Группа, к которой будет относиться пост',
         }
+        error_messages = {
+            # Хвост файла сверх предела не сохраняется, и Pillow его
+            # не прочтёт: слишком большой файл приходит сюда.
+            'image': {
+                'invalid_image': (
+                    'Загрузите правильное изображение не больше '
+                    f'{IMAGE_MAX_BYTES // 1024 ** 2} МБ.'
+                ),
+            },
+        }
         widgets = {
             'text': Textarea(attrs={
                 'cols': 40,
@@ -23,13 +85,28 @@ class PostForm(forms.ModelForm):
                 'class': 'form-control',
                 "required id": 'id_text',
             }),
-            "group": Select(attrs={
+            "group": AutocompleteSelect(autocomplete.GROUP, attrs={
                 'select name': 'group',
                 'class': 'form-control',
                 'id': 'id_group'
             })
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            try:
+                images.check_upload(image)
+                image = images.reencode(image)
+            except (OSError, Image.DecompressionBombError):
+                # Заголовок читается, а данные битые: verify() у
+                # ImageField такое пропускает, а декодирование — нет.
+                raise ValidationError(
+                    'Картинка повреждена или не читается.',
+                    code='broken_image'
+                )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,121 @@
+"""Проверка, перекодирование и сведения о картинках постов."""
+import os
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, ImageSequence
+
+from .conf import (IMAGE_FORMATS, IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS,
+                   IMAGE_MAX_SIDE, IMAGE_QUALITY)
+
+# Для среднего цвета хватает уменьшенной копии: JPEG декодируется сразу
+# в малом масштабе, не разворачивая всю картинку в памяти.
+COLOR_SAMPLE = (64, 64)
+# Поля Post со сведениями о картинке, в порядке значений measure().
+META_FIELDS = ('image_width', 'image_height', 'image_bytes', 'image_color')
+# От MPO хранится только основной кадр, обычным JPEG.
+SAVE_FORMATS = {'MPO': 'JPEG'}
+
+
+def measure(file_, size):
+    """Размеры, вес в байтах и средний цвет картинки из открытого файла."""
+    file_.seek(0)
+    with Image.open(file_) as image:
+        width, height = image.size
+        image.draft('RGB', COLOR_SAMPLE)
+        sample = image.convert('RGB')
+        sample.thumbnail(COLOR_SAMPLE)
+        red, green, blue = sample.resize((1, 1), Image.BOX).getpixel((0, 0))
+    file_.seek(0)
+    return dict(zip(META_FIELDS, (
+        width, height, size, f'#{red:02x}{green:02x}{blue:02x}'
+    )))
+
+
+def empty():
+    return dict(zip(META_FIELDS, (None, None, None, '')))
+
+
+def _open(upload):
+    """Картинка загрузки без декодирования: Pillow читает только заголовок."""
+    if hasattr(upload, 'temporary_file_path'):
+        return Image.open(upload.temporary_file_path())
+    upload.seek(0)
+    return Image.open(upload)
+
+
+def check_upload(upload):
+    """Отказывает загрузкам, которые дорого декодировать."""
+    if upload.size > IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='too_large',
+            params={'limit': IMAGE_MAX_BYTES // 1024 ** 2}
+        )
+    with _open(upload) as image:
+        width, height = image.size
+        image_format = image.format
+        frames = 1 if image_format == 'MPO' else getattr(image, 'n_frames', 1)
+        pixels = width * height * frames
+    if image_format not in IMAGE_FORMATS:
+        raise ValidationError(
+            'Поддерживаются форматы %(formats)s.',
+            code='bad_format',
+            params={'formats': ', '.join(IMAGE_FORMATS)}
+        )
+    if pixels > IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)d мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': IMAGE_MAX_PIXELS // 1000 ** 2}
+        )
+
+
+def _fit(image):
+    image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+    # EXIF и XMP не переживают перекодирования: там бывают координаты.
+    for key in ('exif', 'xmp', 'XML:com.adobe.xmp'):
+        image.info.pop(key, None)
+    return image
+
+
+def reencode(upload):
+    """Новый файл картинки: без EXIF, повёрнутый, не больше IMAGE_MAX_SIDE.
+
+    JPEG декодируется сразу в уменьшенном масштабе, так что память
+    ограничена IMAGE_MAX_SIDE, а не размером исходника. От MPO остаётся
+    основной кадр в JPEG.
+    """
+    with _open(upload) as image:
+        image_format = SAVE_FORMATS.get(image.format, image.format)
+        params = {}
+        if image_format != 'JPEG' and getattr(image, 'is_animated', False):
+            frames = [
+                _fit(frame.copy()) for frame in ImageSequence.Iterator(image)
+            ]
+            result = frames[0]
+            params.update(
+                save_all=True,
+                append_images=frames[1:],
+                loop=image.info.get('loop', 0),
+                duration=image.info.get('duration', 100),
+            )
+        else:
+            image.draft(None, (IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+            result = _fit(ImageOps.exif_transpose(image))
+        if 'icc_profile' in image.info:
+            params['icc_profile'] = image.info['icc_profile']
+    if image_format == 'JPEG':
+        if result.mode not in ('RGB', 'L'):
+            result = result.convert('RGB')
+        params.update(quality=IMAGE_QUALITY, optimize=True, progressive=True)
+    elif image_format == 'WEBP':
+        params.update(quality=IMAGE_QUALITY)
+    elif image_format == 'PNG':
+        params.update(optimize=True)
+    output = BytesIO()
+    result.save(output, image_format, **params)
+    return ContentFile(
+        output.getvalue(), name=os.path.basename(upload.name)
+    )
@@ -0,0 +1,279 @@
+"""Массовый импорт постов из JSONL и CSV.
+
+Посты пишутся bulk_create пачками, по нескольку пачек в транзакции.
+Сигналы на строку при этом не срабатывают: ленты, счётчики, ссылки на
+картинки и версии кэша досчитываются одним проходом в конце по
+диапазонам id закоммиченных строк, даже если импорт прервался ошибкой.
+Индекс поиска пополняют триггеры FTS5 в тех же транзакциях.
+"""
+import csv
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import autocomplete, counters, storage, thumbnails, timeline
+from .cache import PAGES_SCOPE, bump_version
+from .conf import (IMPORT_BATCH_SIZE, IMPORT_TRANSACTION_BATCHES,
+                   LOOKUP_CHUNK)
+from .models import Group, Post
+from .utils import chunked
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(file_, file_format):
+    """Строки файла как (номер строки, словарь); битая строка — None."""
+    if file_format == 'csv':
+        reader = csv.DictReader(file_)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(file_, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def parse_date(value):
+    """Дата публикации из строки ISO 8601; пустая — сейчас."""
+    if not value:
+        return timezone.now()
+    try:
+        pub_date = parse_datetime(value)
+    except (TypeError, ValueError):
+        pub_date = None
+    if pub_date is None:
+        raise RowError(f'неверная дата {value!r}')
+    if timezone.is_naive(pub_date):
+        pub_date = timezone.make_aware(pub_date)
+    return pub_date
+
+
+def check_image(value):
+    """Имя уже лежащей в хранилище картинки, не выходящее за него."""
+    image = value or ''
+    if not isinstance(image, str) or (
+        image.startswith('/') or '..' in image.split('/')
+    ):
+        raise RowError(f'недопустимое имя картинки {image!r}')
+    return image
+
+
+def restore_dates(pks, dates):
+    """Возвращает постам даты из файла.
+
+    auto_now переписывает их в bulk_create, а отключать его у полей
+    модели нельзя: поля общие для всего процесса. Один подготовленный
+    UPDATE на строку дешевле, чем CASE из bulk_update.
+    """
+    field = Post._meta.get_field('pub_date')
+    connection = connections[router.db_for_write(Post)]
+    values = [
+        (field.get_db_prep_value(date, connection),) * 2 + (pk,)
+        for pk, date in zip(pks, dates)
+    ]
+    table = connection.ops.quote_name(Post._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {table} SET pub_date = %s, updated_at = %s '
+            f'WHERE id = %s',
+            values
+        )
+
+
+class Lookup:
+    """Кэш имя -> id; промахи пачки добираются одним запросом IN."""
+
+    def __init__(self, model, field, factory=None):
+        self.model = model
+        self.field = field
+        self.factory = factory
+        self.known = {}
+        self.created = 0
+
+    def _fetch(self, names):
+        found = {}
+        for chunk in chunked(names, LOOKUP_CHUNK):
+            found.update(self.model.objects.filter(
+                **{f'{self.field}__in': chunk}
+            ).values_list(self.field, 'pk'))
+        return found
+
+    def resolve(self, names):
+        missing = {
+            name for name in names
+            if isinstance(name, str) and name not in self.known
+        }
+        if not missing:
+            return
+        found = self._fetch(missing)
+        absent = missing - set(found)
+        if absent and self.factory is not None:
+            self.model.objects.bulk_create(
+                [self.factory(name) for name in absent],
+                ignore_conflicts=True
+            )
+            created = self._fetch(absent)
+            self.created += len(created)
+            found.update(created)
+        self.known.update(dict.fromkeys(missing))
+        self.known.update(found)
+
+    def get(self, name):
+        if not isinstance(name, str):
+            return None
+        return self.known.get(name)
+
+
+def new_user(username):
+    return get_user_model()(username=username, password=make_password(None))
+
+
+def new_group(slug):
+    return Group(slug=slug, title=slug, description='')
+
+
+class Importer:
+    """Пишет посты пачками и в конце досчитывает всё, что пропустили сигналы.
+
+    report(готово, пропущено, секунд) зовётся после каждой транзакции,
+    skip(номер строки, причина) — на каждую пропущенную строку.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE,
+                 transaction_batches=IMPORT_TRANSACTION_BATCHES,
+                 create_missing=False, report=None, skip=None):
+        self.batch_size = batch_size
+        self.transaction_batches = transaction_batches
+        self.authors = Lookup(
+            get_user_model(), 'username', new_user if create_missing else None
+        )
+        self.groups = Lookup(
+            Group, 'slug', new_group if create_missing else None
+        )
+        self.report = report or (lambda done, skipped, elapsed: None)
+        self.skip = skip or (lambda number, reason: None)
+        # Пачки текущей транзакции: (первый id, последний id, авторы).
+        self.pending = []
+        self.ranges = []
+        self.author_ids = set()
+        self.done = self.skipped = self.images = 0
+
+    def run(self, rows):
+        started = time.monotonic()
+        batches = chunked(rows, self.batch_size)
+        try:
+            for group in chunked(batches, self.transaction_batches):
+                self.pending = []
+                with transaction.atomic():
+                    for batch in group:
+                        self._write(batch)
+                self._commit()
+                self.report(
+                    self.done, self.skipped, time.monotonic() - started
+                )
+        finally:
+            # Закоммиченные до ошибки пачки тоже досчитываются.
+            if self.done:
+                self._finish()
+        return self.done
+
+    def _commit(self):
+        """Пачки транзакции закоммичены: их диапазоны идут в _finish."""
+        for first, last, author_ids in self.pending:
+            self.done += last - first + 1
+            self.author_ids.update(author_ids)
+            if self.ranges and self.ranges[-1][1] == first - 1:
+                first = self.ranges.pop()[0]
+            self.ranges.append((first, last))
+        self.pending = []
+
+    def _write(self, batch):
+        self.authors.resolve(
+            row.get('author') for _, row in batch if row
+        )
+        self.groups.resolve(
+            row.get('group') for _, row in batch if row and row.get('group')
+        )
+        posts = []
+        for number, row in batch:
+            try:
+                posts.append(self._post(row))
+            except RowError as error:
+                self.skipped += 1
+                self.skip(number, str(error))
+        if not posts:
+            return
+        dates = [post.pub_date for post in posts]
+        Post.objects.bulk_create(posts)
+        # SQLite не возвращает id из bulk_create, но AUTOINCREMENT и
+        # блокировка записи до конца транзакции дают сплошной диапазон.
+        last = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first()
+        first = last - len(posts) + 1
+        restore_dates(range(first, last + 1), dates)
+        self.pending.append(
+            (first, last, {post.author_id for post in posts})
+        )
+
+    def _post(self, row):
+        if row is None:
+            raise RowError('строка не разбирается как JSON-объект')
+        text = row.get('text')
+        if not isinstance(text, str) or not text.strip():
+            raise RowError('нет текста')
+        author_id = self.authors.get(row.get('author'))
+        if author_id is None:
+            raise RowError(f'нет автора {row.get("author")!r}')
+        group_id = None
+        if row.get('group'):
+            group_id = self.groups.get(row['group'])
+            if group_id is None:
+                raise RowError(f'нет группы {row["group"]!r}')
+        pub_date = parse_date(row.get('pub_date'))
+        image = check_image(row.get('image'))
+        return Post(
+            text=text,
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=pub_date,
+            image=image,
+        )
+
+    def imported(self):
+        """Посты, вставленные этим импортом."""
+        condition = Q()
+        for first, last in self.ranges:
+            condition |= Q(pk__range=(first, last))
+        return Post.objects.filter(condition)
+
+    def _finish(self):
+        posts = self.imported()
+        timeline.fan_out_posts(posts)
+        counters.recount_posts(*self.author_ids)
+        images = posts.exclude(image='').order_by().values('image').annotate(
+            total=Count('pk')
+        ).values_list('image', 'total')
+        names = []
+        for name, total in images.iterator():
+            storage.retain(name, total)
+            names.append(name)
+        thumbnails.enqueue(*names, requeue=False)
+        self.images = len(names)
+        scopes = [PAGES_SCOPE, 'post_count']
+        if self.authors.created or self.groups.created:
+            scopes.append(autocomplete.SCOPE)
+        bump_version(*scopes)
@@ -0,0 +1,49 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.cache import PAGES_SCOPE, bump_version
+from posts.conf import IMAGE_META_BATCH_SIZE
+from posts.images import measure
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает размеры, вес и средний цвет картинок постов, '
+        'загруженных до появления этих полей'
+    )
+
+    def handle(self, *args, **options):
+        pending = Post.objects.exclude(image='').filter(
+            image_width__isnull=True
+        ).order_by('pk').values_list('pk', 'image')
+        storage = Post._meta.get_field('image').storage
+        done = failed = 0
+        last_pk = 0
+        while True:
+            # Пачки по ключу: в памяти не больше пачки, и обновления строк
+            # не мешают открытому курсору.
+            batch = list(pending.filter(pk__gt=last_pk)[
+                :IMAGE_META_BATCH_SIZE
+            ])
+            if not batch:
+                break
+            for pk, name in batch:
+                try:
+                    with storage.open(name) as file_:
+                        meta = measure(file_, storage.size(name))
+                except (OSError, SuspiciousFileOperation) as error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                Post.objects.filter(pk=pk).update(
+                    updated_at=timezone.now(), **meta
+                )
+                done += 1
+            last_pk = batch[-1][0]
+        if done:
+            bump_version(PAGES_SCOPE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}, с ошибкой: {failed}'
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.conf import THUMBNAIL_BATCH_SIZE
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Ставит в очередь миниатюр все картинки существующих постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requeue',
+            action='store_true',
+            help='Пересобрать и готовые: нужно после смены вариантов.'
+        )
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        batch = []
+        queued = 0
+        for name in images.iterator():
+            batch.append(name)
+            if len(batch) == THUMBNAIL_BATCH_SIZE:
+                thumbnails.enqueue(*batch, requeue=options['requeue'])
+                queued += len(batch)
+                batch = []
+        thumbnails.enqueue(*batch, requeue=options['requeue'])
+        queued += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'В очереди картинок: {queued}'
+        ))
@@ -0,0 +1,76 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+
+from posts import collector
+from posts.conf import MEDIA_GC_GRACE, MEDIA_GC_RATE, MEDIA_QUARANTINE_ROOT
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит картинки постов без ссылок и файлы миниатюр без записей '
+        'в kvstore и переносит их в карантин или удаляет'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только перечислить найденные файлы.'
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Удалять картинки, а не переносить в карантин.'
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=MEDIA_GC_GRACE,
+            help='Не трогать файлы моложе стольких секунд.'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=MEDIA_GC_RATE,
+            help='Не больше стольких действий в секунду; 0 — без паузы.'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        storage = collector.image_storage()
+        images = thumbnails = 0
+        for name in collector.orphan_images(options['grace']):
+            if not collector.is_orphan(name, options['grace']):
+                continue
+            images += 1
+            thumbnails += len(collector.thumbnails_of(name))
+            self.stdout.write(f'картинка {name}')
+            if options['dry_run']:
+                continue
+            collector.forget_image(name)
+            if options['delete']:
+                storage.delete(name)
+            else:
+                os.renames(
+                    storage.path(name),
+                    os.path.join(MEDIA_QUARANTINE_ROOT, name)
+                )
+            self.throttle()
+        for name in collector.stray_thumbnails(options['grace']):
+            thumbnails += 1
+            self.stdout.write(f'миниатюра {name}')
+            if options['dry_run']:
+                continue
+            default.storage.delete(name)
+            self.throttle()
+        verb = 'Найдено' if options['dry_run'] else 'Убрано'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} картинок: {images}, миниатюр: {thumbnails}'
+        ))
+
+    def throttle(self):
+        if self.options['rate'] > 0:
+            time.sleep(1 / self.options['rate'])
@@ -0,0 +1,92 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.conf import FEED_ORDERING, NUMBER_OF_POSTED, TIMELINE_ORDERING
+from posts.models import AuthorStats, Comment, Follow, Post
+from posts.utils import CursorPaginator
+
+PROBLEMS = (
+    (re.compile(r'\bSCAN (TABLE )?\w+$'), 'полный просмотр таблицы'),
+    (re.compile(r'TEMP B-TREE'), 'сортировка во временном B-дереве'),
+)
+
+
+def feed_pages(name, queryset, ordering=FEED_ORDERING):
+    """Первая страница ленты и страницы по курсору в обе стороны."""
+    paginator = CursorPaginator(queryset, NUMBER_OF_POSTED, ordering)
+    key = [timezone.now(), 0]
+    limit = NUMBER_OF_POSTED + 1
+    yield f'{name}: первая страница', paginator.window(
+        queryset, None, False, limit
+    )
+    yield f'{name}: следующая страница', paginator.window(
+        queryset, key, False, limit
+    )
+    yield f'{name}: предыдущая страница', paginator.window(
+        queryset, key, True, limit
+    )
+
+
+def feed_queries():
+    """Запросы, которые выполняют представления лент, по именам."""
+    feed = Post.objects.for_feed()
+    yield from feed_pages('index', feed)
+    yield 'index: ?page=', feed.order_by(*FEED_ORDERING)[
+        10 * NUMBER_OF_POSTED:11 * NUMBER_OF_POSTED
+    ]
+    yield from feed_pages('group_posts', feed.filter(group_id=0))
+    yield from feed_pages('profile', feed.filter(author_id=0))
+    yield 'profile: счётчики', AuthorStats.objects.filter(user_id=0)
+    yield from feed_pages(
+        'follow_index (timeline)',
+        feed.filter(timeline__user_id=0),
+        TIMELINE_ORDERING
+    )
+    yield 'follow_index (merge): подписки', Follow.objects.filter(
+        user_id=0
+    ).values_list('author_id', flat=True)
+    yield 'post_detail: пост', feed.filter(pk=0)
+    yield 'post_detail: комментарии', Comment.objects.filter(
+        post_id__in=[0]
+    ).select_related('author').order_by('created')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит EXPLAIN QUERY PLAN запросов лент и отмечает полные '
+        'просмотры таблиц и сортировки во временных B-деревьях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Завершиться с ошибкой, если найдены проблемные планы.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов написана для SQLite.')
+        problems = 0
+        for name, queryset in feed_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in queryset.explain().splitlines():
+                detail = line.split(' ', 3)[-1]
+                notes = [
+                    note for pattern, note in PROBLEMS
+                    if pattern.search(detail)
+                ]
+                if notes:
+                    problems += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'  {detail}  <- {", ".join(notes)}'
+                    ))
+                else:
+                    self.stdout.write(f'  {detail}')
+        if problems and options['strict']:
+            raise CommandError(f'Проблемных шагов в планах: {problems}')
+        style = self.style.WARNING if problems else self.style.SUCCESS
+        self.stdout.write(style(f'Проблемных шагов в планах: {problems}'))
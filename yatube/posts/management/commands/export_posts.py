@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты или комментарии пользователя в JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Чьи записи выгружать.')
+        parser.add_argument(
+            '--kind',
+            choices=sorted(exporter.KINDS),
+            default='posts',
+            help='Посты или комментарии пользователя.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(exporter.FORMATS),
+            default='jsonl',
+            help='Формат выгрузки.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для выгрузки; по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Нет пользователя {options["username"]!r}.')
+        lines = exporter.lines(user, options['kind'], options['format'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        path = options['output']
+        with open(path, 'w', encoding='utf-8', newline='') as file_:
+            file_.writelines(lines)
@@ -0,0 +1,86 @@
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.conf import IMPORT_BATCH_SIZE, IMPORT_TRANSACTION_BATCHES
+from posts.importer import Importer, read_rows
+
+# Дальше пропущенные строки только считаются.
+SHOWN_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из JSONL или CSV с полями text, author, '
+        'group, pub_date, image'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с постами; - читает stdin.')
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат файла; по умолчанию по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Постов в одном bulk_create.'
+        )
+        parser.add_argument(
+            '--transaction-batches',
+            type=int,
+            default=IMPORT_TRANSACTION_BATCHES,
+            help='Пачек в одной транзакции.'
+        )
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Создавать неизвестных авторов и группы.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        if options['batch_size'] < 1 or options['transaction_batches'] < 1:
+            raise CommandError('Размеры пачек должны быть положительными.')
+        self.errors = 0
+        importer = Importer(
+            batch_size=options['batch_size'],
+            transaction_batches=options['transaction_batches'],
+            create_missing=options['create_missing'],
+            report=self.report,
+            skip=self.skip,
+        )
+        if path == '-':
+            done = importer.run(read_rows(sys.stdin, file_format))
+        else:
+            try:
+                file_ = open(path, encoding='utf-8', newline='')
+            except OSError as error:
+                raise CommandError(error)
+            with file_:
+                done = importer.run(read_rows(file_, file_format))
+        if importer.images:
+            call_command(
+                'backfill_image_meta', stdout=self.stdout, stderr=self.stderr
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {done}, пропущено строк: '
+            f'{importer.skipped}, картинок в очереди: {importer.images}'
+        ))
+
+    def report(self, done, skipped, elapsed):
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{done} постов, {skipped} пропущено, {rate:.0f} строк/с'
+        )
+
+    def skip(self, number, reason):
+        self.errors += 1
+        if self.errors <= SHOWN_ERRORS:
+            self.stderr.write(f'строка {number}: {reason}')
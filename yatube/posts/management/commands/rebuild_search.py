@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс FTS5 и его триггеры'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных, индекс которой перестраивается.'
+        )
+        parser.add_argument(
+            '--optimize', action='store_true',
+            help='Слить сегменты индекса после перестройки.'
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.install(using):
+            search.rebuild(using)
+        if options['optimize']:
+            search.optimize(using)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано записей: {search.indexed(using)}'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.cache import PAGES_SCOPE, bump_version
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики и чинит расхождения'
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile()
+        if fixed:
+            bump_version(PAGES_SCOPE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено строк: {fixed}'
+        ))
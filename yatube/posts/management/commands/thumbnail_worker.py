@@ -0,0 +1,95 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.conf import THUMBNAIL_BATCH_SIZE, THUMBNAIL_WORKERS
+
+
+class InlineExecutor:
+    """Исполнитель без пула: для --workers 0 и отладки."""
+
+    def map(self, func, *iterables):
+        return map(func, *iterables)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def build_safely(name):
+    """Собирает миниатюры в процессе пула; ошибку отдаёт строкой."""
+    try:
+        thumbnails.build(name)
+    except Exception as error:
+        return f'{type(error).__name__}: {error}'
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Собирает миниатюры картинок постов из очереди заданий'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=THUMBNAIL_WORKERS,
+            help='Процессов в пуле; 0 — собирать в текущем процессе.'
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=THUMBNAIL_BATCH_SIZE,
+            help='Сколько заданий забирать из очереди за раз.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и выйти, не дожидаясь новых заданий.'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Пауза между опросами пустой очереди, секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] == 0:
+            executor = InlineExecutor()
+        else:
+            # Пул запускается лениво, уже после claim(), и при fork
+            # унаследовал бы открытое соединение с базой. spawn начинает
+            # с чистого процесса, которому нужен только django.setup():
+            # задания распаковываются уже после него.
+            executor = ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+        done = failed = 0
+        try:
+            while True:
+                names = thumbnails.claim(options['batch'])
+                if not names:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                errors = executor.map(build_safely, names)
+                for name, error in zip(names, errors):
+                    job = thumbnails.finish(name, error)
+                    if error is None:
+                        done += 1
+                    else:
+                        self.stderr.write(f'{name}: {error}')
+                        if job.status == job.FAILED:
+                            failed += 1
+        finally:
+            executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, с ошибкой: {failed}'
+        ))
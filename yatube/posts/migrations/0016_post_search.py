@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:31
+
+from django.db import migrations
+
+TABLE = 'posts_post_search'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_media_blob'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+                f"text, content='posts_post', content_rowid='id')",
+                f"CREATE TRIGGER {TABLE}_insert "
+                f"AFTER INSERT ON posts_post BEGIN "
+                f"INSERT INTO {TABLE}(rowid, text) "
+                f"VALUES (new.id, new.text); END",
+                f"CREATE TRIGGER {TABLE}_delete "
+                f"AFTER DELETE ON posts_post BEGIN "
+                f"INSERT INTO {TABLE}({TABLE}, rowid, text) "
+                f"VALUES ('delete', old.id, old.text); END",
+                f"CREATE TRIGGER {TABLE}_update "
+                f"AFTER UPDATE OF text ON posts_post BEGIN "
+                f"INSERT INTO {TABLE}({TABLE}, rowid, text) "
+                f"VALUES ('delete', old.id, old.text); "
+                f"INSERT INTO {TABLE}(rowid, text) "
+                f"VALUES (new.id, new.text); END",
+                f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')",
+            ],
+            reverse_sql=[
+                f"DROP TRIGGER IF EXISTS {TABLE}_insert",
+                f"DROP TRIGGER IF EXISTS {TABLE}_delete",
+                f"DROP TRIGGER IF EXISTS {TABLE}_update",
+                f"DROP TABLE IF EXISTS {TABLE}",
+            ],
+        ),
+    ]
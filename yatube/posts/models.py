@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -13,6 +15,18 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты с автором и группой одним запросом, без лишних колонок."""
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'updated_at', 'image', 'image_color',
+            'comments_count',
+            'author', 'author__username',
+            'author__first_name', 'author__last_name',
+            'group', 'group__title', 'group__slug',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -22,6 +36,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -40,11 +58,48 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Заполняются при загрузке, чтобы не открывать файл при отрисовке.
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, editable=False
+    )
+    image_bytes = models.PositiveIntegerField(
+        'Размер картинки', null=True, editable=False
+    )
+    image_color = models.CharField(
+        'Средний цвет картинки', max_length=7, blank=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # id в хвосте индексов совпадает с ключом ленты (-pub_date, -id):
+        # без него SQLite досортировывает страницу во временном B-дереве.
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -70,6 +125,14 @@ class Comment (models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -93,3 +156,97 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'Подписчик: {self.user}, автор: {self.author}'
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок: строка на пару подписчик/пост."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='timeline_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'Лента {self.user}: {self.post}'
+
+
+class AuthorStats(models.Model):
+    """Счётчики автора, которые поддерживаются сигналами."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class ThumbnailJob(models.Model):
+    """Задание фоновому воркеру: собрать миниатюры картинки."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'В работе'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    image = models.CharField('Картинка', max_length=100, unique=True)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    updated = models.DateTimeField('Изменено', auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'id'],
+                name='thumbnail_job_status_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'Миниатюры {self.image}: {self.get_status_display()}'
+
+
+class MediaBlob(models.Model):
+    """Файл хранилища по содержимому и число постов со ссылкой на него."""
+    name = models.CharField('Файл', max_length=100, unique=True)
+    refs = models.PositiveIntegerField('Ссылок', default=0)
+    updated = models.DateTimeField('Изменено', auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.refs}'
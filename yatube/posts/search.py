@@ -0,0 +1,136 @@
+"""Полнотекстовый поиск по постам на FTS5 SQLite.
+
+Индекс — внешняя FTS5-таблица над posts_post: тексты в ней не
+дублируются, а синхронизируют её триггеры, поэтому в индекс попадают
+и bulk_create, и update() мимо сигналов.
+"""
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .conf import SEARCH_MAX_WORDS
+from .models import Post
+
+TABLE = 'posts_post_search'
+
+INSTALL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    f"text, content='posts_post', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_insert "
+    f"AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_delete "
+    f"AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {TABLE}({TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_update "
+    f"AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {TABLE}({TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END",
+)
+
+MATCH = f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+
+
+def expression(query):
+    """Запрос FTS5 из пользовательской строки.
+
+    Слова берутся в кавычки, чтобы операторы FTS5 и кавычки в запросе
+    не ломали разбор; последнее слово ищется по префиксу.
+    """
+    words = re.findall(r'\w+', query)[:SEARCH_MAX_WORDS]
+    if not words:
+        return ''
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+def matching(query):
+    """Подзапрос id постов для filter(pk__in=...), например в админке."""
+    return RawSQL(MATCH, [expression(query)])
+
+
+class SearchResults:
+    """Найденные посты по убыванию релевантности (bm25) для Paginator.
+
+    Срез выбирает из индекса только id своей страницы, а посты
+    страницы приходят одним запросом for_feed().
+    """
+
+    def __init__(self, query, using='default'):
+        self.expression = expression(query)
+        self.using = using
+
+    def _fetch(self, sql, params):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, [self.expression] + params)
+            return cursor.fetchall()
+
+    def count(self):
+        if not self.expression:
+            return 0
+        return self._fetch(
+            f'SELECT count(*) FROM {TABLE} WHERE {TABLE} MATCH %s', []
+        )[0][0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('SearchResults поддерживает только срезы.')
+        start = index.start or 0
+        if not self.expression or index.stop is None or index.stop <= start:
+            return []
+        ids = [row[0] for row in self._fetch(
+            f'{MATCH} ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+            [index.stop - start, start]
+        )]
+        posts = Post.objects.using(self.using).for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def install(using='default'):
+    """Создаёт индекс и триггеры, если их нет; True — индекс был создан.
+
+    SQLite при изменении полей Post пересобирает posts_post, и её
+    триггеры пропадают: поэтому install зовётся и после каждого migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if 'posts_post' not in tables:
+            return False
+        created = TABLE not in tables
+        for statement in INSTALL:
+            cursor.execute(statement)
+    if created:
+        rebuild(using)
+    return created
+
+
+def rebuild(using='default'):
+    """Перестраивает индекс по текущему содержимому posts_post."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def optimize(using='default'):
+    """Сливает сегменты индекса в один."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def indexed(using='default'):
+    """Число записей в индексе, а не в posts_post, на которую он смотрит."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {TABLE}_docsize')
+        return cursor.fetchone()[0]
+
+
+def ensure_index(sender, using='default', **kwargs):
+    """Обработчик post_migrate: возвращает триггеры после миграций."""
+    install(using)
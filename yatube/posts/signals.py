@@ -0,0 +1,230 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import autocomplete, counters, images, storage, timeline
+from .cache import (PAGES_SCOPE, bump_version_on_commit, post_scopes,
+                    profile_scopes)
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_counts(sender, **kwargs):
+    bump_version_on_commit('post_count')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_author(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_author(instance.author_id, 'followers_count', 1)
+        counters.bump_author(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, 'followers_count', -1)
+    counters.bump_author(instance.user_id, 'following_count', -1)
+
+
+# Страницы лент кэшируются по версиям областей: запись сбрасывает версии
+# страниц, где пост был виден до неё и где виден после.
+@receiver(pre_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def remember_post_pages(sender, instance, **kwargs):
+    instance._stale_pages = post_scopes(instance.pk) if instance.pk else set()
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_pages(sender, instance, **kwargs):
+    bump_version_on_commit(
+        *instance._stale_pages | post_scopes(instance.pk)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_pages(sender, instance, **kwargs):
+    bump_version_on_commit(*instance._stale_pages)
+
+
+@receiver(pre_delete, sender=Comment)
+def remember_comment_pages(sender, instance, **kwargs):
+    instance._stale_pages = post_scopes(instance.post_id)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_saved_comment_pages(sender, instance, **kwargs):
+    bump_version_on_commit(*post_scopes(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_deleted_comment_pages(sender, instance, **kwargs):
+    bump_version_on_commit(*instance._stale_pages)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    # post_count: состав ленты подписок меняется, а SQL её счётчика нет.
+    bump_version_on_commit(
+        'post_count', *profile_scopes(instance.author_id, instance.user_id)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, **kwargs):
+    bump_version_on_commit(PAGES_SCOPE)
+
+
+# Карточки постов кэшируются по updated_at: правка группы видна в них.
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def touch_group_posts(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        instance.posts.update(updated_at=timezone.now())
+
+
+# Карточки и ленты показывают имя автора: его правку видно тем же путём.
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def remember_author_name(sender, instance, raw=False, update_fields=None,
+                         **kwargs):
+    instance._old_name = None
+    # Вход сохраняет только last_login: имя не менялось.
+    if raw or not instance.pk or update_fields and not (
+        set(update_fields) & set(AUTHOR_NAME_FIELDS)
+    ):
+        return
+    instance._old_name = sender.objects.filter(pk=instance.pk).values_list(
+        *AUTHOR_NAME_FIELDS
+    ).first()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def touch_author_posts(sender, instance, created=False, raw=False, **kwargs):
+    old = getattr(instance, '_old_name', None)
+    if created or raw or old is None:
+        return
+    if old == tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS):
+        return
+    instance.posts.update(updated_at=timezone.now())
+    bump_version_on_commit(PAGES_SCOPE)
+
+
+@receiver(pre_save, sender=Post)
+def measure_image(sender, instance, raw=False, **kwargs):
+    """Сведения о картинке снимаются с загрузки, пока файл в памяти."""
+    if raw:
+        return
+    image = instance.image
+    if not image:
+        meta = images.empty()
+    elif not image._committed:
+        meta = images.measure(image.file, image.size)
+    else:
+        return
+    for field, value in meta.items():
+        setattr(instance, field, value)
+
+
+# Ссылки постов на файлы хранилища по содержимому.
+@receiver(pre_save, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._old_image = instance.pk and Post.objects.filter(
+        pk=instance.pk
+    ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, **kwargs):
+    if instance.image.name != instance._old_image:
+        storage.retain(instance.image.name)
+        storage.release(instance._old_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    storage.release(instance.image.name)
+
+
+@receiver(post_save, sender=Group)
+def index_group(sender, instance, raw=False, **kwargs):
+    if not raw:
+        entry = autocomplete.group_entry(
+            instance.pk, instance.title, instance.slug
+        )
+        transaction.on_commit(lambda: autocomplete.index.update(
+            autocomplete.GROUP, instance.pk, entry
+        ))
+
+
+@receiver(post_delete, sender=Group)
+def unindex_group(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: autocomplete.index.update(autocomplete.GROUP, pk)
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Вход сохраняет только last_login: имя не менялось.
+    if raw or update_fields and 'username' not in update_fields:
+        return
+    entry = autocomplete.user_entry(instance.pk, instance.username)
+    transaction.on_commit(lambda: autocomplete.index.update(
+        autocomplete.USER, instance.pk, entry
+    ))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def unindex_user(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: autocomplete.index.update(autocomplete.USER, pk)
+    )
@@ -0,0 +1,66 @@
+"""Хранилище картинок постов с именами по содержимому.
+
+Одинаковые загрузки ложатся в один файл posts/ab/<sha256>.<ext>, поэтому
+файл по имени никогда не меняется и его можно кэшировать навсегда. Сколько
+постов ссылается на файл, считает MediaBlob: файл с живыми ссылками
+хранилище не удалит.
+"""
+import hashlib
+import os
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+def content_name(name, content):
+    """Имя файла по sha256 содержимого в каталоге исходного имени."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    digest = digest.hexdigest()
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(
+        os.path.dirname(name), digest[:2], f'{digest}{extension}'
+    )
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def _save(self, name, content):
+        name = content_name(name, content)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    def delete(self, name):
+        MediaBlob = apps.get_model('posts', 'MediaBlob')
+        if MediaBlob.objects.filter(name=name, refs__gt=0).exists():
+            return
+        super().delete(name)
+
+
+def retain(name, count=1):
+    """Ещё count ссылок на файл."""
+    if not name:
+        return
+    MediaBlob = apps.get_model('posts', 'MediaBlob')
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name)], ignore_conflicts=True
+    )
+    MediaBlob.objects.filter(name=name).update(
+        refs=F('refs') + count, updated=timezone.now()
+    )
+
+
+def release(name):
+    """Минус ссылка; файл без ссылок удаляет сборщик мусора, не запрос."""
+    if not name:
+        return
+    MediaBlob = apps.get_model('posts', 'MediaBlob')
+    MediaBlob.objects.filter(name=name, refs__gt=0).update(
+        refs=F('refs') - 1, updated=timezone.now()
+    )
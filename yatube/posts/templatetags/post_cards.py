@@ -0,0 +1,45 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+from posts.conf import CARD_CACHE_TIMEOUT
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_list.html'
+CARD_KEY = 'posts:card:{}:{}'
+
+
+def card_key(post):
+    return CARD_KEY.format(post.pk, post.updated_at.timestamp())
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Отрисованные карточки постов страницы за один get_many.
+
+    {% post_cards page_obj as cards %} отдаёт готовый HTML карточек в
+    порядке постов.
+
+    Изменение поста сдвигает updated_at, а с ним и ключ карточки, так
+    что устаревшие карточки просто не читаются и истекают сами. Миниатюры
+    недостающих карточек ищутся разом, до отрисовки.
+    """
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    if len(cards) < len(keys):
+        card = get_template(CARD_TEMPLATE)
+        stale = [
+            (key, post) for key, post in zip(keys, posts)
+            if key not in cards
+        ]
+        thumbnails.attach(post for _, post in stale)
+        for key, post in stale:
+            missing[key] = card.render({'post': post})
+        cache.set_many(missing, CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
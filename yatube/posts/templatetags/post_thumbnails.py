@@ -0,0 +1,18 @@
+from django import template
+from django.templatetags.static import static
+
+from posts.conf import THUMBNAIL_PLACEHOLDER
+from posts.thumbnails import get_ready
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_picture(file_):
+    """Варианты картинки, которые воркер уже собрал; ничего не строит."""
+    return get_ready(file_)
+
+
+@register.simple_tag
+def thumbnail_placeholder():
+    return static(THUMBNAIL_PLACEHOLDER)
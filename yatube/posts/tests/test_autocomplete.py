@@ -0,0 +1,133 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.autocomplete import SCOPE, index
+from posts.cache import bump_version
+from posts.conf import AUTOCOMPLETE_MAX_AGE
+from posts.forms import PostForm
+from posts.models import Group, Post, User
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Котовод')
+        User.objects.create_user(username='кошатница')
+        cls.group = Group.objects.create(
+            title='Любители котов', slug='cats', description='Описание'
+        )
+        Group.objects.create(
+            title='Собаки', slug='dogs', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, query, kind=''):
+        response = self.client.get(
+            reverse('posts:autocomplete'), {'q': query, 'type': kind}
+        )
+        return [
+            result.get('title') or result.get('username')
+            for result in response.json()['results']
+        ]
+
+    def test_prefixes(self):
+        """Подсказки по началу имени, слова названия и slug группы"""
+        self.assertEqual(
+            self.found('кот'), ['Любители котов', 'Котовод']
+        )
+        self.assertEqual(self.found('КОШ'), ['кошатница'])
+        self.assertEqual(self.found('ca'), ['Любители котов'])
+        self.assertEqual(self.found('кот', 'user'), ['Котовод'])
+        self.assertEqual(self.found(''), [])
+        response = self.client.get(
+            reverse('posts:autocomplete'), {'q': 'к', 'type': 'post'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_warm_index_needs_no_queries(self):
+        """Тёплый индекс отвечает из памяти процесса"""
+        self.found('кот')
+        with self.assertNumQueries(0):
+            self.found('соб')
+
+    def test_index_has_max_age(self):
+        """Правку из другого процесса индекс видит не позже MAX_AGE"""
+        self.found('кот')
+        # Как запись в другом процессе с отдельным кэшем: без сигналов.
+        Group.objects.bulk_create([
+            Group(title='Котики', slug='kitties', description='Описание')
+        ])
+        self.assertNotIn('Котики', self.found('котик'))
+        later = time.monotonic() + AUTOCOMPLETE_MAX_AGE + 1
+        clock = mock.Mock(monotonic=lambda: later)
+        with mock.patch('posts.autocomplete.time', clock):
+            self.assertEqual(self.found('котик'), ['Котики'])
+
+    def test_changes_are_applied_in_place(self):
+        """Правки групп и пользователей доходят до индекса без перестройки"""
+        self.found('кот')
+        with capture_on_commit_callbacks(execute=True):
+            self.group.title = 'Любители кошек'
+            self.group.save()
+            User.objects.filter(username='кошатница').delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.found('кош'), ['Любители кошек'])
+            self.assertEqual(self.found('кот'), ['Котовод'])
+
+    def test_login_keeps_version(self):
+        """Вход пользователя не сбрасывает индекс в других процессах"""
+        self.found('кот')
+        version = index.version
+        Client().force_login(self.user)
+        self.assertEqual(index.version, version)
+
+    def test_other_process_change_rebuilds(self):
+        """Чужая правка видна по версии: индекс строится заново"""
+        self.found('кот')
+        Group.objects.filter(pk=self.group.pk).update(title='Мимо сигналов')
+        bump_version(SCOPE)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.found('мимо'), ['Мимо сигналов'])
+
+
+class AutocompleteSelectTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Автор формы')
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {index}', slug=f'group-{index}',
+                description='Описание'
+            )
+            for index in range(5)
+        ]
+
+    def test_only_selected_group_is_rendered(self):
+        """В разметке формы только выбранная группа"""
+        with self.assertNumQueries(0):
+            html = PostForm().as_p()
+        self.assertEqual(html.count('<option'), 1)
+        self.assertIn('data-autocomplete-url', html)
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.groups[3]
+        )
+        html = PostForm(instance=post).as_p()
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn('Группа 3', html)
+        html = PostForm(data={'text': 'Текст', 'group': 'мусор'}).as_p()
+        self.assertEqual(html.count('<option'), 1)
+
+    def test_any_group_is_still_valid(self):
+        """Проверка выбора по-прежнему идёт по всем группам"""
+        form = PostForm(data={'text': 'Текст', 'group': self.groups[4].pk})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['group'], self.groups[4])
@@ -0,0 +1,64 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.counters import get_stats
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def test_stats_created_lazily(self):
+        """Счётчики создаются при первом чтении точным подсчётом"""
+        self.assertFalse(AuthorStats.objects.exists())
+        stats = get_stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        with self.assertNumQueries(1):
+            get_stats(self.author)
+
+    def test_signals_keep_counters(self):
+        """Посты, подписки и комментарии сдвигают счётчики"""
+        get_stats(self.author)
+        get_stats(self.reader)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        author, reader = get_stats(self.author), get_stats(self.reader)
+        self.post.refresh_from_db()
+        self.assertEqual(author.posts_count, 2)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(reader.following_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+        follow.delete()
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(get_stats(self.author).followers_count, 0)
+        self.assertEqual(get_stats(self.reader).following_count, 0)
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_reconcile_command(self):
+        """reconcile_counters чинит расхождения после массовых операций"""
+        get_stats(self.author)
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {index}')
+            for index in range(3)
+        )
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('2', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(get_stats(self.author).posts_count, 4)
+        self.assertEqual(self.post.comments_count, 0)
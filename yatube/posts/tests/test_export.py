@@ -0,0 +1,102 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Выгружающий')
+        cls.other = User.objects.create_user(username='other')
+        group = Group.objects.create(
+            title='Группа', slug='export', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=group if index % 2 else None,
+                text=f'Пост, "с кавычками" {index}\nи переносом'
+            )
+            for index in range(5)
+        ]
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Свой комментарий'
+        )
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.other, text='Чужой комментарий'
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.authorized_client.get(reverse('posts:export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_jsonl_posts(self):
+        """JSONL с постами только самого пользователя, новые первыми"""
+        response, content = self.export()
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="posts.jsonl"'
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [post.pk for post in reversed(self.posts)]
+        )
+        self.assertEqual(rows[-1]['text'], self.posts[0].text)
+        self.assertEqual(rows[-1]['author'], 'Выгружающий')
+        self.assertEqual(rows[-2]['group'], 'export')
+
+    def test_csv_comments(self):
+        """CSV с шапкой и комментариями пользователя"""
+        _, content = self.export(kind='comments', format='csv')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['text'], 'Свой комментарий')
+        self.assertEqual(rows[0]['post'], str(self.posts[0].pk))
+
+    def test_rows_are_read_lazily(self):
+        """Строки читаются из базы по мере отдачи ответа"""
+        with self.assertNumQueries(2):
+            response = self.authorized_client.get(reverse('posts:export'))
+        with self.assertNumQueries(1):
+            list(response.streaming_content)
+
+    def test_bad_params_and_anonymous(self):
+        """Неизвестный вид выгрузки — 400, аноним идёт на вход"""
+        response = self.authorized_client.get(
+            reverse('posts:export'), {'kind': 'users'}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_command_output_imports_back(self):
+        """Выгрузка команды загружается обратно import_posts"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.csv')
+            call_command(
+                'export_posts', 'Выгружающий', '--format', 'csv',
+                '--output', path
+            )
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 10)
+        self.assertEqual(
+            Post.objects.filter(text=self.posts[3].text).count(), 2
+        )
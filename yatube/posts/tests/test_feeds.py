@@ -0,0 +1,85 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Автор ленты')
+        cls.group = Group.objects.create(
+            title='Группа ленты', slug='feed', description='Описание группы'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост для читалки'
+        )
+        cls.urls = [
+            reverse('posts:index_rss'),
+            reverse('posts:index_atom'),
+            reverse('posts:group_rss', kwargs={'slug': 'feed'}),
+            reverse('posts:group_atom', kwargs={'slug': 'feed'}),
+            reverse('posts:profile_rss', kwargs={'username': 'Автор ленты'}),
+            reverse('posts:profile_atom', kwargs={'username': 'Автор ленты'}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    # Подменяет часы версий кэша: версии выходят из прошлого.
+    past = mock.Mock(time=lambda: time.time() - 60)
+
+    def test_feeds_list_posts(self):
+        """RSS и Atom ленты отдают посты со ссылками на них"""
+        link = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Пост для читалки')
+                self.assertContains(response, link)
+        self.assertContains(
+            self.client.get(self.urls[3]), '<subtitle>Описание группы'
+        )
+        response = self.client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_unchanged_feed_is_not_modified(self):
+        """Опрос с If-Modified-Since без изменений — 304 без запросов"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                # Версии из прошлого: Last-Modified текущей секунды
+                # не отдаётся.
+                with mock.patch('posts.cache.time', self.past):
+                    last_modified = self.client.get(url)['Last-Modified']
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=last_modified
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_new_post_refreshes_feeds(self):
+        """Новый пост сдвигает Last-Modified своих лент"""
+        with mock.patch('posts.cache.time', self.past):
+            stamps = {
+                url: self.client.get(url)['Last-Modified']
+                for url in self.urls
+            }
+        with capture_on_commit_callbacks(execute=True):
+            Post.objects.create(
+                author=self.user, group=self.group, text='Ещё один пост'
+            )
+        for url, stamp in stamps.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=stamp)
+                self.assertContains(response, 'Ещё один пост')
@@ -1,11 +1,14 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..forms import CommentForm, PostForm
 from ..models import Comment, Group, Post
@@ -71,9 +74,10 @@ class PostFormTests(TestCase):
             'posts:profile', kwargs={'username': 'name_auth'})
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
+        # Файл назван по sha256 содержимого.
         self.assertTrue(Post.objects.filter(
             text='Текст поста',
-            image='posts/small.gif'
+            image__regex=r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
         ).exists())
 
     def test_post_edit_valid(self):
@@ -98,6 +102,89 @@ class PostFormTests(TestCase):
         self.assertEqual(self.post.pk, collation_post.pk)
 
 
+def jpeg_with_orientation(size, orientation):
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    output = BytesIO()
+    Image.new('RGB', size, 'red').save(output, 'JPEG', exif=exif.tobytes())
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, content, name='photo.jpg'):
+        return self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Фото',
+            'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+        })
+
+    def test_exif_stripped_and_orientation_applied(self):
+        """Картинка перекодируется: без EXIF и повёрнутая по ориентации"""
+        self.upload(jpeg_with_orientation((40, 20), 6))
+        post = Post.objects.get(text='Фото')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertNotIn('exif', image.info)
+        self.assertEqual((post.image_width, post.image_height), (20, 40))
+
+    def test_mpo_saved_as_jpeg(self):
+        """Снимок телефона в MPO принимается и хранится как JPEG"""
+        frames = [
+            Image.new('RGB', (30, 20), color) for color in ('red', 'blue')
+        ]
+        content = BytesIO()
+        frames[0].save(
+            content, 'MPO', save_all=True, append_images=frames[1:]
+        )
+        self.upload(content.getvalue())
+        post = Post.objects.get(text='Фото')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (30, 20))
+
+    def test_truncated_jpeg_is_form_error(self):
+        """Обрезанный JPEG — ошибка формы, а не 500"""
+        output = BytesIO()
+        Image.effect_noise((200, 200), 64).convert('RGB').save(
+            output, 'JPEG'
+        )
+        content = output.getvalue()
+        response = self.upload(content[:len(content) // 2])
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка повреждена или не читается.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_limits(self):
+        """Слишком тяжёлые и слишком большие картинки отклоняются"""
+        content = jpeg_with_orientation((40, 20), 1)
+        with mock.patch('posts.images.IMAGE_MAX_PIXELS', 100):
+            response = self.upload(content)
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 0 мегапикселей.'
+        )
+        limit = len(content) // 2
+        with mock.patch('posts.uploads.IMAGE_MAX_BYTES', limit), \
+                mock.patch('posts.images.IMAGE_MAX_BYTES', limit):
+            response = self.upload(content)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+
 class CommentFormTest(TestCase):
     @classmethod
     def setUpClass(cls):
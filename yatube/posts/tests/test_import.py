@@ -0,0 +1,143 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase
+
+from posts import search
+from posts.cache import PAGES_SCOPE, get_version
+from posts.counters import get_stats
+from posts.importer import Importer, read_rows
+from posts.models import Follow, Group, MediaBlob, Post, ThumbnailJob
+from posts.models import Timeline
+
+User = get_user_model()
+
+
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.author = User.objects.create_user(username='importer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Импорт', slug='import', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.existing = Post.objects.create(author=cls.author, text='Старый')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file_:
+            file_.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_posts', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_import(self):
+        """Посты из JSONL пишутся пачками, всё пропущенное досчитывается"""
+        get_stats(self.author)
+        version = get_version(PAGES_SCOPE)
+        rows = [
+            {
+                'text': f'Импортированный пост {index}',
+                'author': 'importer',
+                'group': 'import' if index % 2 else '',
+                'pub_date': f'2020-01-{index + 1:02d}T12:00:00',
+            }
+            for index in range(7)
+        ]
+        lines = [json.dumps(row, ensure_ascii=False) for row in rows]
+        lines[3:3] = ['не json', json.dumps({'text': 'x', 'author': 'nobody'})]
+        path = self.write('posts.jsonl', '\n'.join(lines) + '\n')
+        out, err = self.run_import(
+            path, '--batch-size', '3', '--transaction-batches', '2'
+        )
+        self.assertIn('Импортировано постов: 7, пропущено строк: 2', out)
+        self.assertIn('строк/с', out)
+        self.assertIn('строка 4', err)
+        self.assertIn("нет автора 'nobody'", err)
+        imported = Post.objects.exclude(pk=self.existing.pk)
+        self.assertEqual(imported.count(), 7)
+        self.assertEqual(imported.filter(group=self.group).count(), 3)
+        first = imported.get(text='Импортированный пост 0')
+        self.assertEqual(first.pub_date.date(), datetime.date(2020, 1, 1))
+        self.assertEqual(first.updated_at, first.pub_date)
+        # Старый пост попал в ленту ещё при создании.
+        self.assertEqual(
+            Timeline.objects.filter(user=self.reader).count(), 8
+        )
+        self.assertEqual(get_stats(self.author).posts_count, 8)
+        self.assertEqual(len(search.SearchResults('импортированный')), 7)
+        self.assertNotEqual(get_version(PAGES_SCOPE), version)
+        # Сигналы при импорте не срабатывали, даты не затёрты auto_now.
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_interrupted_import_finishes_committed_batches(self):
+        """Ошибка в поздней транзакции: записанное раньше досчитывается"""
+        get_stats(self.author)
+        lines = ''.join(
+            json.dumps({'text': f'Пост {index}', 'author': 'importer'}) + '\n'
+            for index in range(4)
+        )
+        bulk_create = Post.objects.bulk_create
+        calls = []
+
+        def failing_second(posts, *args, **kwargs):
+            calls.append(posts)
+            if len(calls) > 1:
+                raise DatabaseError('диск полон')
+            return bulk_create(posts, *args, **kwargs)
+
+        importer = Importer(batch_size=2, transaction_batches=1)
+        with mock.patch.object(Post.objects, 'bulk_create', failing_second):
+            with self.assertRaises(DatabaseError):
+                importer.run(read_rows(StringIO(lines), 'jsonl'))
+        self.assertEqual(importer.done, 2)
+        self.assertEqual(
+            Timeline.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(get_stats(self.author).posts_count, 3)
+
+    def test_csv_import_creates_missing(self):
+        """CSV с неизвестными авторами и группами при --create-missing"""
+        path = self.write(
+            'posts.csv',
+            'text,author,group,image\n'
+            'Первый,новичок,new-group,posts/ab/missing.png\n'
+            '"Второй, с запятой",новичок,,posts/ab/missing.png\n'
+            'Третий,importer,,../secret.png\n'
+        )
+        out, err = self.run_import(path, '--create-missing')
+        self.assertIn('Импортировано постов: 2, пропущено строк: 1', out)
+        self.assertIn('строка 4: недопустимое имя картинки', err)
+        newcomer = User.objects.get(username='новичок')
+        self.assertFalse(newcomer.has_usable_password())
+        self.assertTrue(Group.objects.filter(slug='new-group').exists())
+        self.assertTrue(Post.objects.filter(text='Второй, с запятой').exists())
+        self.assertEqual(
+            MediaBlob.objects.get(name='posts/ab/missing.png').refs, 2
+        )
+        self.assertTrue(
+            ThumbnailJob.objects.filter(image='posts/ab/missing.png').exists()
+        )
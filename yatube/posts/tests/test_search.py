@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.conf import NUMBER_OF_POSTED
+from posts.models import Post, User
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Искатель')
+        cls.often = Post.objects.create(
+            author=cls.user, text='Кошка, кошка и ещё раз кошка'
+        )
+        cls.once = Post.objects.create(
+            author=cls.user, text='Про собаку и одну кошку'
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Про погоду')
+
+    def found(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_results_are_ranked(self):
+        """Чаще встречающееся слово поднимает пост выше"""
+        self.assertEqual(self.found('кошка'), [self.often])
+        self.assertEqual(self.found('кошк'), [self.often, self.once])
+
+    def test_index_follows_posts(self):
+        """Триггеры держат индекс в согласии с текстами постов"""
+        self.other.text = 'Про кошачью погоду'
+        self.other.save()
+        Post.objects.filter(pk=self.once.pk).update(text='Только собака')
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Новая кошечка')
+        ])
+        self.assertEqual(len(self.found('кош')), 3)
+        self.assertEqual(self.found('собака'), [self.once])
+        Post.objects.filter(pk=self.often.pk).delete()
+        self.assertEqual(len(self.found('кош')), 2)
+
+    def test_query_syntax_is_escaped(self):
+        """Кавычки и операторы FTS5 в запросе не ломают поиск"""
+        for query in ('"кошка', 'кошка OR NOT', 'AND', '*', ''):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:search'), {'q': query}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_pages_keep_query(self):
+        """Страницы результатов выбирают из индекса только свои id"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Кот номер {index}')
+            for index in range(NUMBER_OF_POSTED + 1)
+        )
+        url = reverse('posts:search')
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'q': 'кот', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82&amp;page=1')
+
+    def test_rebuild_command(self):
+        """Команда возвращает потерянные триггеры и переиндексирует"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.TABLE}_insert')
+        Post.objects.create(author=self.user, text='Пропущенная кошка')
+        self.assertEqual(search.indexed(), 3)
+        out = StringIO()
+        call_command('rebuild_search', '--optimize', stdout=out)
+        self.assertIn('4', out.getvalue())
+        self.assertEqual(search.indexed(), 4)
+        Post.objects.create(author=self.user, text='Замеченная кошка')
+        self.assertEqual(len(self.found('кошк')), 4)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через индекс"""
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, _ = admin.get_search_results(
+            request, Post.objects.all(), 'погод'
+        )
+        self.assertEqual(list(queryset), [self.other])
+        self.assertIn('MATCH', str(queryset.query))
+        queryset, _ = admin.get_search_results(
+            request, Post.objects.all(), '!!!'
+        )
+        self.assertEqual(list(queryset), [])
@@ -0,0 +1,165 @@
+import datetime
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sorl.thumbnail import default
+
+from posts import collector
+from posts.models import MediaBlob, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='keeper')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def post_with(self, name, content):
+        post = Post(author=self.user, text=name)
+        post.image.save(name, ContentFile(content))
+        return post
+
+    def refs(self, name):
+        return MediaBlob.objects.get(name=name).refs
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые загрузки делят один файл с именем по содержимому"""
+        first = self.post_with('one.gif', b'GIF89a same')
+        second = self.post_with('two.gif', b'GIF89a same')
+        other = self.post_with('one.gif', b'GIF89a other')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(first.image.name, r'^posts/\w{2}/\w{64}\.gif$')
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1
+        )
+        self.assertEqual(self.refs(first.image.name), 2)
+
+    def test_referenced_blob_survives_delete(self):
+        """Файл с живыми ссылками не удаляется, без ссылок — удаляется"""
+        first = self.post_with('one.gif', b'GIF89a shared')
+        second = self.post_with('two.gif', b'GIF89a shared')
+        name = first.image.name
+        first.delete()
+        self.assertEqual(self.refs(name), 1)
+        second.image.storage.delete(name)
+        self.assertTrue(second.image.storage.exists(name))
+        second.image = None
+        second.save()
+        self.assertEqual(self.refs(name), 0)
+        second.image.storage.delete(name)
+        self.assertFalse(second.image.storage.exists(name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CollectMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='collector')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        kept = Post(author=self.user, text='Живой')
+        kept.image.save('kept.gif', ContentFile(b'GIF89a kept'))
+        gone = Post(author=self.user, text='Удалённый')
+        gone.image.save('gone.gif', ContentFile(b'GIF89a gone'))
+        gone.delete()
+        self.kept, self.gone = kept.image.name, gone.image.name
+        self.stray = default.storage.save(
+            'cache/ab/cd/stray.jpg', ContentFile(b'jpeg')
+        )
+        self.storage = kept.image.storage
+
+    def collect(self, *args):
+        out = StringIO()
+        call_command(
+            'collect_media', '--grace', '0', '--rate', '0', *args,
+            stdout=out
+        )
+        return out.getvalue()
+
+    def test_dry_run_lists_orphans_only(self):
+        """Пробный прогон находит сирот и ничего не трогает"""
+        out = self.collect('--dry-run')
+        self.assertIn(self.gone, out)
+        self.assertIn(self.stray, out)
+        self.assertNotIn(self.kept, out)
+        self.assertTrue(self.storage.exists(self.gone))
+        self.assertTrue(default.storage.exists(self.stray))
+
+    def test_orphans_quarantined_and_strays_deleted(self):
+        """Сироты уезжают в карантин, лишние миниатюры удаляются"""
+        quarantine = tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)
+        with mock.patch(
+            'posts.management.commands.collect_media.MEDIA_QUARANTINE_ROOT',
+            quarantine
+        ):
+            self.collect()
+        self.assertFalse(self.storage.exists(self.gone))
+        self.assertTrue(
+            os.path.exists(os.path.join(quarantine, self.gone))
+        )
+        self.assertFalse(default.storage.exists(self.stray))
+        self.assertTrue(self.storage.exists(self.kept))
+        self.assertFalse(MediaBlob.objects.filter(name=self.gone).exists())
+
+    def test_recently_released_blob_waits_for_grace(self):
+        """Старый файл, который только что отпустили, ждёт срока"""
+        old = time.time() - 2 * 3600
+        os.utime(self.storage.path(self.gone), (old, old))
+        call_command(
+            'collect_media', '--grace', '3600', '--rate', '0', '--delete',
+            stdout=StringIO()
+        )
+        self.assertTrue(self.storage.exists(self.gone))
+        MediaBlob.objects.filter(name=self.gone).update(
+            updated=timezone.now() - datetime.timedelta(hours=2)
+        )
+        call_command(
+            'collect_media', '--grace', '3600', '--rate', '0', '--delete',
+            stdout=StringIO()
+        )
+        self.assertFalse(self.storage.exists(self.gone))
+
+    def test_flat_directory_is_checked_in_chunks(self):
+        """Старый плоский каталог проверяется пачками запросов IN"""
+        # Загрузки до хранилища по содержимому лежат прямо в posts/.
+        legacy = [f'posts/legacy{index}.gif' for index in range(5)]
+        for name in legacy:
+            with open(self.storage.path(name), 'wb') as file_:
+                file_.write(b'GIF89a legacy')
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Старый', image=name)
+            for name in legacy[:2]
+        )
+        with mock.patch('posts.collector.LOOKUP_CHUNK', 2):
+            chunks = list(collector.walk(self.storage, 'posts'))
+            orphans = set(collector.orphan_images(grace=0))
+        self.assertTrue(all(len(chunk) <= 2 for chunk in chunks))
+        self.assertTrue(set(legacy[2:]) <= orphans)
+        self.assertFalse(set(legacy[:2]) & orphans)
+        self.assertNotIn(self.kept, orphans)
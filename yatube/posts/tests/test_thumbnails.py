@@ -0,0 +1,196 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.conf import (CARD_VARIANTS, THUMBNAIL_MAX_ATTEMPTS,
+                        THUMBNAIL_PLACEHOLDER)
+from posts.models import Post, ThumbnailJob
+from posts.thumbnails import attach, enqueue
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='painter')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Записи sorl о миниатюрах лежат в общем кэше и переживают откат.
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def run_worker(self):
+        call_command(
+            'thumbnail_worker', '--workers', '0', '--once',
+            stdout=StringIO(), stderr=StringIO()
+        )
+
+    def test_upload_queues_job_and_worker_builds_it(self):
+        """Загрузка ставит задание, а до сборки показывается заглушка"""
+        with capture_on_commit_callbacks(execute=True):
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'С картинкой',
+                'image': SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, 'image/gif'
+                ),
+            })
+        post = Post.objects.get(text='С картинкой')
+        job = ThumbnailJob.objects.get()
+        self.assertEqual(job.image, post.image.name)
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        self.assertContains(self.client.get(url), THUMBNAIL_PLACEHOLDER)
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.DONE)
+        response = self.client.get(url)
+        self.assertNotContains(response, THUMBNAIL_PLACEHOLDER)
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_missing_source_fails_after_retries(self):
+        """Битое задание уходит в ошибку после нескольких попыток"""
+        enqueue('posts/missing.gif')
+        self.run_worker()
+        job = ThumbnailJob.objects.get()
+        self.assertEqual(job.status, ThumbnailJob.FAILED)
+        self.assertEqual(job.attempts, THUMBNAIL_MAX_ATTEMPTS)
+        self.assertIn('FileNotFoundError', job.error)
+
+    def test_upload_retries_failed_job(self):
+        """Новая загрузка той же картинки повторяет упавшее задание"""
+        with capture_on_commit_callbacks(execute=True):
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'С картинкой',
+                'image': SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, 'image/gif'
+                ),
+            })
+        ThumbnailJob.objects.update(
+            status=ThumbnailJob.FAILED, attempts=THUMBNAIL_MAX_ATTEMPTS,
+            error='OSError'
+        )
+        with capture_on_commit_callbacks(execute=True):
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'Та же картинка',
+                'image': SimpleUploadedFile(
+                    'same.gif', SMALL_GIF, 'image/gif'
+                ),
+            })
+        job = ThumbnailJob.objects.get()
+        self.assertEqual(
+            (job.status, job.attempts, job.error),
+            (ThumbnailJob.PENDING, 0, '')
+        )
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.DONE)
+
+    def test_backfill_skips_known_images(self):
+        """Досыпка ставит в очередь только картинки без заданий"""
+        for name in ('posts/a.gif', 'posts/b.gif'):
+            Post.objects.create(author=self.user, text=name, image=name)
+        ThumbnailJob.objects.create(
+            image='posts/a.gif', status=ThumbnailJob.DONE
+        )
+        call_command('backfill_thumbnails', stdout=StringIO())
+        self.assertEqual(
+            dict(ThumbnailJob.objects.values_list('image', 'status')),
+            {
+                'posts/a.gif': ThumbnailJob.DONE,
+                'posts/b.gif': ThumbnailJob.PENDING,
+            }
+        )
+
+    def test_page_thumbnails_resolved_in_one_query(self):
+        """Все варианты картинок страницы ищутся одним запросом"""
+        posts = []
+        for index in range(3):
+            post = Post(author=self.user, text=f'Картинка {index}')
+            post.image.save(f'page{index}.gif', ContentFile(SMALL_GIF))
+            posts.append(post)
+        attach(posts)
+        self.assertEqual([post.thumbnail for post in posts], [None] * 3)
+        enqueue(*(post.image.name for post in posts))
+        self.run_worker()
+        cache.clear()
+        with self.assertNumQueries(1):
+            attach(posts)
+        for post in posts:
+            self.assertEqual(
+                len(post.thumbnail.variants), len(CARD_VARIANTS)
+            )
+        with self.assertNumQueries(0):
+            attach(posts)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageMetaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='measurer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_is_measured(self):
+        """Размеры, вес и цвет картинки сохраняются при загрузке"""
+        post = Post(author=self.user, text='Замер')
+        post.image = SimpleUploadedFile('meta.gif', SMALL_GIF, 'image/gif')
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertEqual(post.image_bytes, len(SMALL_GIF))
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+        post.image = None
+        post.save()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_color, '')
+
+    def test_backfill_command(self):
+        """Досыпка снимает сведения со старых картинок и пропускает битые"""
+        old = Post(author=self.user, text='Старая')
+        old.image.save('old.gif', ContentFile(SMALL_GIF))
+        Post.objects.filter(pk=old.pk).update(
+            image_width=None, image_height=None, image_bytes=None
+        )
+        Post.objects.create(
+            author=self.user, text='Битая', image='posts/missing.gif'
+        )
+        out = StringIO()
+        call_command('backfill_image_meta', stdout=out, stderr=StringIO())
+        old.refresh_from_db()
+        self.assertEqual((old.image_width, old.image_height), (2, 1))
+        self.assertIn('Обработано картинок: 1, с ошибкой: 1', out.getvalue())
@@ -0,0 +1,130 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.conf import NUMBER_OF_POSTED
+from posts.models import Follow, Post, Timeline
+from posts.timeline import get_follow_page
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+        Post.objects.create(author=cls.stranger, text='Чужой')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка добавляет старые посты автора, отписка убирает их"""
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}
+        ))
+        self.assertEqual(self.feed(), [self.old_post])
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}
+        ))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+
+    def test_new_post_fans_out(self):
+        """Новый пост автора попадает в ленты его подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+        self.assertFalse(
+            Timeline.objects.filter(user=self.stranger).exists()
+        )
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timelines восстанавливает ленты по подпискам"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Timeline.objects.all().delete()
+        Timeline.objects.create(
+            user=self.stranger,
+            post=self.old_post,
+            pub_date=self.old_post.pub_date
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(Timeline.objects.values_list('user', 'post')),
+            [(self.reader.pk, self.old_post.pk)]
+        )
+
+
+class FollowFeedEngineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        authors = [
+            User.objects.create_user(username=f'author{index}')
+            for index in range(3)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for index in range(25):
+            Post.objects.create(
+                author=authors[index % 3], text=f'Пост {index}'
+            )
+        cls.expected = list(
+            Post.objects.filter(author__in=authors).order_by(
+                '-pub_date', '-id'
+            ).values_list('pk', flat=True)
+        )
+
+    def walk(self, engine):
+        request = RequestFactory().get('/follow/')
+        request.user = self.reader
+        page = get_follow_page(request, engine)
+        seen = [post.pk for post in page]
+        while page.has_next():
+            request = RequestFactory().get(
+                '/follow/', {'cursor': page.next_cursor}
+            )
+            request.user = self.reader
+            page = get_follow_page(request, engine)
+            seen.extend(post.pk for post in page)
+        return seen, page
+
+    def test_engines_agree(self):
+        """Слияние по авторам и материализованная лента совпадают"""
+        for engine in ('merge', 'timeline', 'auto'):
+            with self.subTest(engine=engine):
+                seen, _ = self.walk(engine)
+                self.assertEqual(seen, self.expected)
+
+    def test_merge_walks_back(self):
+        """Курсор назад у слияния возвращает предыдущую страницу"""
+        _, last = self.walk('merge')
+        request = RequestFactory().get(
+            '/follow/', {'cursor': last.previous_cursor}
+        )
+        request.user = self.reader
+        page = get_follow_page(request, 'merge')
+        self.assertEqual(
+            [post.pk for post in page],
+            self.expected[NUMBER_OF_POSTED:2 * NUMBER_OF_POSTED]
+        )
+
+    def test_merge_query_count(self):
+        """Слияние стоит один запрос подписок и по запросу на автора"""
+        request = RequestFactory().get('/follow/')
+        request.user = self.reader
+        with self.assertNumQueries(4):
+            get_follow_page(request, 'merge')
@@ -0,0 +1,181 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.conf import NUMBER_OF_POSTED
+from posts.models import Post
+from posts.utils import CachedCountPaginator, CursorPaginator
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        posts = Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост №{index}', pk=index)
+            for index in range(1, 26)
+        )
+        # У пар постов одинаковая дата: ключ должен добираться по id.
+        start = posts[0].pub_date
+        for index, post in enumerate(posts):
+            post.pub_date = start + datetime.timedelta(minutes=index // 2)
+        Post.objects.bulk_update(posts, ['pub_date'])
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.paginator = CursorPaginator(Post.objects.all(), NUMBER_OF_POSTED)
+
+    def test_walk_forward_and_back(self):
+        """Курсоры обходят ленту без пропусков и повторов в обе стороны"""
+        page = self.paginator.get_page(None)
+        self.assertFalse(page.has_previous())
+        seen = [post.pk for post in page]
+        pages = [page]
+        while page.has_next():
+            page = self.paginator.get_page(page.next_cursor)
+            seen.extend(post.pk for post in page)
+            pages.append(page)
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+        back = self.paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+        self.assertEqual(
+            list(self.paginator.get_page(back.previous_cursor)),
+            list(pages[0])
+        )
+
+    def test_last_cursor(self):
+        """Последняя страница строится с конца ленты"""
+        page = self.paginator.get_page(self.paginator.last_cursor)
+        self.assertEqual(
+            [post.pk for post in page], self.expected[-NUMBER_OF_POSTED:]
+        )
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_invalid_cursor(self):
+        """Битый курсор отдаёт первую страницу"""
+        # WzAsW251bGwsbnVsbF1d — [0, [null, null]].
+        for cursor in ('garbage', 'WzAsIFsxXV0', 'W10',
+                       'WzAsW251bGwsbnVsbF1d'):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(
+                    [post.pk for post in page],
+                    self.expected[:NUMBER_OF_POSTED]
+                )
+
+    def test_views_ignore_null_cursor(self):
+        """Курсор из null в лентах — первая страница, а не 500"""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        ):
+            with self.subTest(url=url):
+                response = Client().get(
+                    url, {'cursor': 'WzAsW251bGwsbnVsbF1d'}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_deep_page_has_no_count_or_offset(self):
+        """Страница по курсору не делает COUNT(*) и OFFSET"""
+        page = self.paginator.get_page(None)
+        page = self.paginator.get_page(page.next_cursor)
+        with self.assertNumQueries(1) as context:
+            self.paginator.get_page(page.next_cursor)
+        sql = context.captured_queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_views_follow_cursor_links(self):
+        """Ленты отдают ссылку на следующую страницу по курсору"""
+        client = Client()
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'auth'})
+        )
+        page = response.context['page_obj']
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            {'cursor': page.next_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            self.expected[NUMBER_OF_POSTED:2 * NUMBER_OF_POSTED]
+        )
+
+
+class CachedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост №{index}', pk=index)
+            for index in range(1, 26)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """Повторный COUNT(*) берётся из кэша"""
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.all(), NUMBER_OF_POSTED).count,
+            25
+        )
+        with self.assertNumQueries(0):
+            paginator = CachedCountPaginator(
+                Post.objects.all(), NUMBER_OF_POSTED
+            )
+            self.assertEqual(paginator.count, 25)
+
+    def test_count_invalidated_on_save_and_delete(self):
+        """Создание и удаление поста сбрасывают закэшированный счётчик"""
+        with capture_on_commit_callbacks(execute=True):
+            post = Post.objects.create(author=self.user, text='Новый пост')
+        paginator = CachedCountPaginator(Post.objects.all(), NUMBER_OF_POSTED)
+        self.assertEqual(paginator.count, 26)
+        with capture_on_commit_callbacks(execute=True):
+            post.delete()
+        paginator = CachedCountPaginator(Post.objects.all(), NUMBER_OF_POSTED)
+        self.assertEqual(paginator.count, 25)
+
+    def test_elided_page_range(self):
+        """Вместо всех номеров выводится окно вокруг текущей страницы"""
+        paginator = CachedCountPaginator(range(1000), NUMBER_OF_POSTED)
+        ellipsis = paginator.ELLIPSIS
+        cases = {
+            1: [1, 2, 3, ellipsis, 100],
+            50: [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100],
+            100: [1, ellipsis, 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)), expected
+                )
+        page = paginator.get_page(50)
+        self.assertEqual(page.elided_page_range, cases[50])
+
+
+class ExplainFeedsTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент обходятся без полных просмотров и сортировок"""
+        out = StringIO()
+        call_command('explain_feeds', '--strict', stdout=out)
+        self.assertIn('Проблемных шагов в планах: 0', out.getvalue())
@@ -1,8 +1,12 @@
 import datetime
+import importlib
 import shutil
 import tempfile
+import time
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.template import Context, Template
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
@@ -10,9 +14,12 @@ from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 
-from posts.models import Post, Group, Follow
+from core.testing import capture_on_commit_callbacks
+from posts import conf
+from posts.models import Comment, Post, Group, Follow
 from posts.forms import PostForm
 from posts.conf import NUMBER_OF_POSTED
+from posts.counters import get_stats
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -265,7 +272,7 @@ class PostCreateTest(TestCase):
         self.assertEqual(post_count, 0)
 
     def test_cache_page_idex(self):
-        '''Новый пост остается в кэше до очистки'''
+        '''Главная берётся из кэша, пока посты не меняются'''
         cache.clear()
         post = Post.objects.create(
             author=self.user,
@@ -273,13 +280,57 @@ class PostCreateTest(TestCase):
         )
         response = self.authorized_client.get(reverse('posts:index'))
         cache_after_adding = response.content
-        post.delete()
+        Post.objects.filter(pk=post.pk).update(text='Мимо сигналов')
         response = self.authorized_client.get(reverse('posts:index'))
-        cache_after_del = response.content
-        cache.clear()
+        self.assertEqual(cache_after_adding, response.content)
+        with capture_on_commit_callbacks(execute=True):
+            post.delete()
         response = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(cache_after_adding, cache_after_del)
-        self.assertNotEqual(cache_after_del, response.content)
+        self.assertNotEqual(cache_after_adding, response.content)
+        self.assertNotContains(response, 'Проверка кэша')
+
+    def test_cache_pages_invalidated_by_scope(self):
+        '''Запись сбрасывает кэш только страниц, где виден пост'''
+        cache.clear()
+        other = User.objects.create_user(username='other')
+        group_url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        other_url = reverse('posts:profile', kwargs={'username': 'other'})
+        self.client.get(group_url)
+        self.client.get(other_url)
+        with capture_on_commit_callbacks(execute=True):
+            post = Post.objects.create(
+                author=self.user, group=self.group, text='Новый в группе'
+            )
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+        self.assertContains(self.client.get(group_url), 'Новый в группе')
+        post.group = None
+        with capture_on_commit_callbacks(execute=True):
+            post.save()
+        self.assertNotContains(self.client.get(group_url), 'Новый в группе')
+        with capture_on_commit_callbacks(execute=True):
+            Follow.objects.create(user=other, author=self.user)
+        self.assertEqual(
+            self.client.get(other_url).context['stats'].following_count, 1
+        )
+
+    def test_local_cache_is_short_lived(self):
+        '''С кэшем процесса страницы, версии и счётчики живут недолго'''
+        self.assertIsNone(conf.VERSION_CACHE_TIMEOUT)
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        try:
+            with override_settings(CACHES=locmem):
+                local = importlib.reload(conf)
+                timeouts = (
+                    local.PAGE_CACHE_TIMEOUT,
+                    local.VERSION_CACHE_TIMEOUT,
+                    local.COUNT_CACHE_TIMEOUT,
+                )
+        finally:
+            importlib.reload(conf)
+        self.assertEqual(timeouts, (conf.LOCAL_CACHE_TIMEOUT,) * 3)
 
 
 class PostFollowTest(TestCase):
@@ -328,3 +379,229 @@ class PostFollowTest(TestCase):
         self.assertEqual(follow_posts, 0)
         post = Post.objects.get(id=self.post.pk)
         self.assertNotIn(post, response.context['page_obj'])
+
+    def test_follow_resets_page_count(self):
+        """Подписка сбрасывает закэшированное число постов ленты"""
+        url = reverse('posts:follow_index')
+        response = self.authorized_client.get(url, {'page': 1})
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+        other = User.objects.create_user(username='Ещё автор')
+        Post.objects.create(author=other, text='Пост другого автора')
+        with capture_on_commit_callbacks(execute=True):
+            Follow.objects.create(user=self.user, author=other)
+        response = self.authorized_client.get(url, {'page': 1})
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+    def test_cached_profile_is_per_user(self):
+        """Закэшированная страница одного пользователя не видна другим"""
+        url = reverse(
+            'posts:profile', kwargs={'username': self.user_auth.username}
+        )
+        alice = User.objects.create_user(username='alice')
+        Follow.objects.create(user=alice, author=self.user_auth)
+        self.authorized_client.force_login(alice)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Отписаться')
+        other = Client()
+        other.force_login(User.objects.create_user(username='bob'))
+        for client in (other, self.guest_client):
+            with self.subTest(client=client):
+                response = client.get(url)
+                self.assertNotContains(response, 'alice')
+                self.assertNotContains(response, 'Отписаться')
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Читатель')
+        for index in range(NUMBER_OF_POSTED):
+            author = User.objects.create_user(username=f'author{index}')
+            group = Group.objects.create(
+                title=f'Группа {index}',
+                slug=f'group-{index}',
+                description='Описание',
+            )
+            cls.post = Post.objects.create(
+                author=author, group=group, text=f'Пост {index}'
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'commenter{index}'),
+                text='Комментарий',
+            )
+            get_stats(author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feed_pages_do_not_query_per_post(self):
+        """Автор и группа постов ленты выбираются вместе с постами"""
+        urls = {
+            reverse('posts:index'): 1,
+            reverse('posts:group_list', kwargs={'slug': 'group-0'}): 2,
+            reverse('posts:profile', kwargs={'username': 'author0'}): 4,
+            # Слияние лент: подписки и по срезу на каждого автора.
+            reverse('posts:follow_index'): 1 + NUMBER_OF_POSTED,
+            # Ещё запрос на ETag поста до выборки самого поста.
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}): 4,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                # Сессия и пользователь: ещё два запроса.
+                with self.assertNumQueries(queries + 2):
+                    self.authorized_client.get(url)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Автор карточек')
+        cls.group = Group.objects.create(
+            title='Группа карточек',
+            slug='cards',
+            description='Описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Карточка {index}')
+            for index in range(NUMBER_OF_POSTED)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def render_cards(self):
+        posts = Post.objects.for_feed()[:NUMBER_OF_POSTED]
+        return Template(
+            '{% load post_cards %}{% post_cards posts as cards %}'
+            '{% for card in cards %}{{ card }}{% endfor %}'
+        ).render(Context({'posts': posts}))
+
+    def test_warm_page_is_one_cache_read(self):
+        """Тёплая страница карточек читается одним get_many без записей"""
+        cold = self.render_cards()
+        get_many = mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        )
+        set_many = mock.patch.object(cache, 'set_many')
+        with get_many as get_many, set_many as set_many:
+            warm = self.render_cards()
+        self.assertEqual(cold, warm)
+        self.assertEqual(get_many.call_count, 1)
+        set_many.assert_not_called()
+
+    def test_card_follows_post_and_group_changes(self):
+        """Правка поста или группы меняет ключ карточки"""
+        self.render_cards()
+        post = Post.objects.first()
+        post.text = 'Исправленная карточка'
+        post.save()
+        self.assertIn('Исправленная карточка', self.render_cards())
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertIn('/group/renamed/', self.render_cards())
+        self.group.delete()
+        self.assertNotIn('/group/renamed/', self.render_cards())
+
+    def test_card_follows_author_name(self):
+        """Новое имя автора видно в карточках, вход их не трогает"""
+        self.render_cards()
+        updated = Post.objects.values_list('updated_at', flat=True).first()
+        self.client.force_login(self.user)
+        self.assertEqual(
+            Post.objects.values_list('updated_at', flat=True).first(),
+            updated
+        )
+        self.user.first_name, self.user.last_name = 'Анна', 'Каренина'
+        self.user.save()
+        self.assertIn('Анна Каренина', self.render_cards())
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Автор условных')
+        cls.group = Group.objects.create(
+            title='Группа условных',
+            slug='conditional',
+            description='Описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Условный пост'
+        )
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'conditional'}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_unchanged_page_is_not_modified(self):
+        """Неизменная страница отвечает 304 без шаблонов"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_feed_validators_need_no_queries(self):
+        """Ленты проверяются по версиям в кэше, без запросов к базе"""
+        # Версии из прошлого: Last-Modified текущей секунды не отдаётся.
+        past = mock.Mock(time=lambda: time.time() - 60)
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                with mock.patch('posts.cache.time', past):
+                    response = self.client.get(url)
+                self.assertIn('max-age=0', response['Cache-Control'])
+                self.assertFalse(response.has_header('Expires'))
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_fresh_change_has_no_last_modified(self):
+        """Правка в текущей секунде не даёт Last-Modified"""
+        response = self.client.get(self.urls[0])
+        self.assertTrue(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_changes_break_validators(self):
+        """Новый пост и комментарий меняют ETag своих страниц"""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        with capture_on_commit_callbacks(execute=True):
+            Post.objects.create(
+                author=self.user, group=self.group, text='Ещё пост'
+            )
+            Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_authorized_validators_are_personal(self):
+        """Авторизованному свой ETag и никакого Last-Modified"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                anonymous = self.client.get(url)
+                response = self.authorized_client.get(url)
+                self.assertNotEqual(response['ETag'], anonymous['ETag'])
+                self.assertFalse(response.has_header('Last-Modified'))
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=anonymous['ETag']
+                )
+                self.assertEqual(response.status_code, 200)
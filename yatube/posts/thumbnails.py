@@ -0,0 +1,239 @@
+"""Миниатюры картинок постов собираются заранее фоновым воркером.
+
+Шаблоны не строят миниатюры сами: resolve только смотрит в kvstore
+sorl, сразу для всей страницы, и пока воркер не успел, там заглушка.
+"""
+import datetime
+
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    KVStore as CachedDbKVStore
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .cache import bump_version, post_scopes
+from .conf import (CARD_FALLBACK_WIDTH, CARD_FORMATS, CARD_SIZES,
+                   CARD_VARIANTS, THUMBNAIL_GEOMETRIES, THUMBNAIL_JOB_TIMEOUT,
+                   THUMBNAIL_MAX_ATTEMPTS)
+from .models import Post, ThumbnailJob
+
+
+def thumbnail_options(source, options):
+    """Опции, с которыми sorl назовёт файл миниатюры (как get_thumbnail)."""
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_file(file_, geometry, options):
+    """ImageFile миниатюры под тем именем, под которым её сохранит sorl."""
+    source = ImageFile(file_)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, thumbnail_options(source, options)
+    )
+    return ImageFile(name, default.storage)
+
+
+class Picture:
+    """Готовые варианты картинки поста для <picture> и srcset."""
+    MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+    def __init__(self, variants):
+        # variants: [(формат, ширина, ImageFile)] только готовых вариантов.
+        self.variants = variants
+        self.sizes = CARD_SIZES
+        # <img src> для браузеров без <picture>: запасной формат, ширина
+        # ближе всего к CARD_FALLBACK_WIDTH.
+        fallback = [
+            (width, image) for image_format, width, image in variants
+            if image_format == CARD_FORMATS[-1]
+        ] or [(width, image) for _, width, image in variants]
+        self.img = min(
+            fallback, key=lambda item: abs(item[0] - CARD_FALLBACK_WIDTH)
+        )[1]
+
+    @property
+    def sources(self):
+        """<source> на каждый формат: srcset из готовых ширин."""
+        sources = []
+        for image_format in CARD_FORMATS:
+            srcset = ', '.join(
+                f'{image.url} {image.width}w'
+                for variant_format, _, image in self.variants
+                if variant_format == image_format
+            )
+            if srcset:
+                sources.append({
+                    'type': self.MIME_TYPES.get(image_format, ''),
+                    'srcset': srcset,
+                })
+        return sources
+
+
+def resolve(files, variants=CARD_VARIANTS):
+    """Готовые варианты картинок страницы; None там, где их ещё нет.
+
+    Вместо запроса в kvstore на каждую миниатюру читает кэш одним
+    get_many, а промахи добирает из таблицы sorl одним запросом IN.
+    Отсутствие миниатюры не кэшируется: её соберёт воркер в другом
+    процессе, и локальный кэш об этом не узнает.
+    """
+    wanted = [
+        [
+            (options.get('format'), geometry, thumbnail_file(
+                file_, geometry, options
+            ))
+            for geometry, options in variants
+        ] if file_ else []
+        for file_ in files
+    ]
+    keys = {
+        add_prefix(thumbnail.key): thumbnail.name
+        for row in wanted for _, _, thumbnail in row
+    }
+    ready = {}
+    if keys:
+        ready = fetch(keys)
+    pictures = []
+    for row in wanted:
+        found = [
+            (image_format, int(geometry.split('x')[0]), ready[thumbnail.name])
+            for image_format, geometry, thumbnail in row
+            if thumbnail.name in ready
+        ]
+        pictures.append(Picture(found) if found else None)
+    return pictures
+
+
+def fetch(keys):
+    """Записи kvstore по ключам: имя миниатюры -> ImageFile с размером."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDbKVStore):
+        images = (
+            kvstore.get(ImageFile(name, default.storage))
+            for name in keys.values()
+        )
+        return {image.name: image for image in images if image}
+    values = {
+        key: value for key, value in kvstore.cache.get_many(keys).items()
+        if value != EMPTY_VALUE
+    }
+    missing = set(keys) - set(values)
+    if missing:
+        stored = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        kvstore.cache.set_many(stored, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(stored)
+    return {
+        keys[key]: deserialize_image_file(value)
+        for key, value in values.items()
+    }
+
+
+def get_ready(file_):
+    """Готовые варианты одной картинки или None."""
+    return resolve([file_])[0]
+
+
+def attach(posts):
+    """Раскладывает по постам готовые варианты картинок в post.thumbnail."""
+    posts = list(posts)
+    pictures = resolve([post.image for post in posts])
+    for post, picture in zip(posts, pictures):
+        post.thumbnail = picture
+    return posts
+
+
+def enqueue(*names, requeue=True):
+    """Ставит картинки в очередь и заново — упавшие задания.
+
+    Упавшее задание иначе держало бы заглушку и у нового поста с той же
+    картинкой. requeue возвращает в очередь и готовые.
+    """
+    names = [name for name in names if name]
+    if not names:
+        return
+    ThumbnailJob.objects.bulk_create(
+        [ThumbnailJob(image=name) for name in names],
+        ignore_conflicts=True
+    )
+    jobs = ThumbnailJob.objects.filter(image__in=names)
+    if requeue:
+        jobs = jobs.exclude(status=ThumbnailJob.PENDING)
+    else:
+        jobs = jobs.filter(status=ThumbnailJob.FAILED)
+    jobs.update(
+        status=ThumbnailJob.PENDING,
+        attempts=0,
+        error='',
+        updated=timezone.now()
+    )
+
+
+def claim(limit):
+    """Забирает до limit заданий; воркеры делят очередь без блокировок."""
+    stale = timezone.now() - datetime.timedelta(
+        seconds=THUMBNAIL_JOB_TIMEOUT
+    )
+    ThumbnailJob.objects.filter(
+        status=ThumbnailJob.RUNNING, updated__lt=stale
+    ).update(status=ThumbnailJob.PENDING)
+    pending = ThumbnailJob.objects.filter(
+        status=ThumbnailJob.PENDING
+    ).order_by('id').values_list('id', 'image')[:limit]
+    claimed = []
+    for pk, image in pending:
+        taken = ThumbnailJob.objects.filter(
+            pk=pk, status=ThumbnailJob.PENDING
+        ).update(status=ThumbnailJob.RUNNING, updated=timezone.now())
+        if taken:
+            claimed.append(image)
+    return claimed
+
+
+def build(name):
+    """Собирает все геометрии THUMBNAIL_GEOMETRIES для одной картинки."""
+    # Ключ исходника в kvstore включает хранилище: берём хранилище поля,
+    # как при отрисовке post.image.
+    source = ImageFile(name, Post._meta.get_field('image').storage)
+    if not source.exists():
+        raise FileNotFoundError(name)
+    for geometry, options in THUMBNAIL_GEOMETRIES:
+        default.backend.get_thumbnail(source, geometry, **options)
+
+
+def finish(name, error=None):
+    """Отмечает результат задания и обновляет страницы с этой картинкой."""
+    job = ThumbnailJob.objects.get(image=name)
+    if error is None:
+        job.status = ThumbnailJob.DONE
+        job.error = ''
+        posts = Post.objects.filter(image=name)
+        post_ids = list(posts.values_list('pk', flat=True))
+        # Карточки и страницы с заглушкой отрисуются заново.
+        posts.update(updated_at=timezone.now())
+        bump_version(*post_scopes(*post_ids))
+    else:
+        job.attempts += 1
+        job.error = error
+        if job.attempts < THUMBNAIL_MAX_ATTEMPTS:
+            job.status = ThumbnailJob.PENDING
+        else:
+            job.status = ThumbnailJob.FAILED
+    job.save()
+    return job
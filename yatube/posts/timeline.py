@@ -0,0 +1,102 @@
+"""Лента подписок: раскладка при записи и слияние при чтении.
+
+Лента /follow/ читается из Timeline диапазоном по индексу
+(user, -pub_date, -post) вместо соединения Post, Follow и User.
+Для пользователей с небольшим числом подписок страница собирается
+слиянием срезов постов каждого автора прямо из Post.
+"""
+from itertools import islice
+
+from django.db import transaction
+
+from .conf import (FOLLOW_FEED_ENGINE, FOLLOW_MERGE_MAX_AUTHORS,
+                   NUMBER_OF_POSTED, TIMELINE_BATCH_SIZE, TIMELINE_ORDERING)
+from .models import Follow, Post, Timeline
+from .utils import MergeCursorPaginator, get_page
+
+
+def _bulk_insert(rows, batch_size=TIMELINE_BATCH_SIZE):
+    rows = iter(rows)
+    batch = list(islice(rows, batch_size))
+    while batch:
+        Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(rows, batch_size))
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True
+    )
+    _bulk_insert(
+        Timeline(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def fan_out_posts(posts):
+    """Раскладывает уже сохранённые посты по лентам подписчиков авторов."""
+    rows = posts.filter(
+        author__following__isnull=False
+    ).order_by().values_list('author__following__user_id', 'pk', 'pub_date')
+    _bulk_insert(
+        Timeline(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for user_id, pk, pub_date in rows.iterator()
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    posts = Post.objects.filter(author_id=follow.author_id).values_list(
+        'pk', 'pub_date'
+    )
+    _bulk_insert(
+        Timeline(user_id=follow.user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def prune(follow):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    Timeline.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id
+    ).delete()
+
+
+def rebuild():
+    """Пересобирает все ленты с нуля по текущим подпискам."""
+    with transaction.atomic():
+        _rebuild()
+
+
+def _rebuild():
+    Timeline.objects.all().delete()
+    for follow in Follow.objects.all().iterator():
+        backfill(follow)
+
+
+def get_follow_page(request, engine=FOLLOW_FEED_ENGINE):
+    """Страница ленты подписок выбранным движком."""
+    user = request.user
+    if engine != 'timeline' and 'page' not in request.GET:
+        author_ids = Follow.objects.filter(user=user).values_list(
+            'author_id', flat=True
+        )
+        if engine == 'auto':
+            author_ids = author_ids[:FOLLOW_MERGE_MAX_AUTHORS + 1]
+        author_ids = list(author_ids)
+        if engine == 'merge' or len(author_ids) <= FOLLOW_MERGE_MAX_AUTHORS:
+            paginator = MergeCursorPaginator(
+                [
+                    Post.objects.for_feed().filter(author_id=pk)
+                    for pk in author_ids
+                ],
+                NUMBER_OF_POSTED
+            )
+            return paginator.get_page(request.GET.get('cursor'))
+    return get_page(
+        Post.objects.for_feed().filter(timeline__user=user),
+        request,
+        TIMELINE_ORDERING
+    )
@@ -0,0 +1,16 @@
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from .conf import IMAGE_MAX_BYTES
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл, но не дальше IMAGE_MAX_BYTES.
+
+    Хвост сверх предела отбрасывается, а size остаётся настоящим: форма
+    увидит превышение и откажет, не читая файл целиком.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        room = IMAGE_MAX_BYTES - start
+        if room > 0:
+            self.file.write(raw_data[:room])
@@ -1,6 +1,7 @@
 from django.urls import path
 
 from . import views
+from .feeds import GroupFeed, IndexFeed, ProfileFeed, atom, feed_view
 
 app_name = 'posts'
 
@@ -10,12 +11,40 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('feed/', feed_view(IndexFeed(), 'index'), name='index_rss'),
+    path(
+        'feed/atom/', feed_view(atom(IndexFeed)(), 'index'),
+        name='index_atom'
+    ),
+    path(
+        'group/<slug:slug>/feed/',
+        feed_view(GroupFeed(), 'group:{slug}'),
+        name='group_rss'
+    ),
+    path(
+        'group/<slug:slug>/feed/atom/',
+        feed_view(atom(GroupFeed)(), 'group:{slug}'),
+        name='group_atom'
+    ),
+    path(
+        'profile/<str:username>/feed/',
+        feed_view(ProfileFeed(), 'profile:{username}'),
+        name='profile_rss'
+    ),
+    path(
+        'profile/<str:username>/feed/atom/',
+        feed_view(atom(ProfileFeed)(), 'profile:{username}'),
+        name='profile_atom'
+    ),
+    path('search/', views.search, name='search'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<post_id>/edit/', views.post_edit, name='post_edit'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('export/', views.export, name='export'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
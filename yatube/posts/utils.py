@@ -1,10 +1,263 @@
+import base64
+import hashlib
+import heapq
+import json
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+from .cache import get_version
+from .conf import (COUNT_CACHE_TIMEOUT, FEED_ORDERING, NUMBER_OF_POSTED,
+                   PAGE_RANGE_ON_EACH_SIDE, PAGE_RANGE_ON_ENDS)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CachedCountMixin:
+    """Берёт COUNT(*) из кэша по сигнатуре SQL запроса.
+
+    Версия 'post_count' сбрасывается сигналами при сохранении и
+    удалении Post и Follow, так что устаревшее число живёт не дольше
+    записи.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return len(self.object_list)
+        signature = hashlib.md5(str(query).encode()).hexdigest()
+        key = f'posts:count:{get_version("post_count")}:{signature}'
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class CachedCountPaginator(CachedCountMixin, Paginator):
+    """Постраничная навигация с окном номеров вместо полного списка."""
+
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, number=1,
+                              on_each_side=PAGE_RANGE_ON_EACH_SIDE,
+                              on_ends=PAGE_RANGE_ON_ENDS):
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.elided_page_range = list(
+            self.get_elided_page_range(page.number)
+        )
+        return page
+
+
+class CursorPaginator(CachedCountMixin, Paginator):
+    """Keyset-пагинация по (pub_date, id).
+
+    Вместо OFFSET страница выбирается условием по ключу последней
+    показанной записи, поэтому глубокие страницы стоят столько же,
+    сколько первая, и COUNT(*) не нужен.
+
+    Страница остаётся обычным Page с атрибутами next_cursor и
+    previous_cursor; number и num_pages описывают только соседей
+    текущей страницы, чтобы has_next()/has_previous() работали без COUNT.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.keys = [
+            (f'cursor_{index}', field.lstrip('-'), field.startswith('-'))
+            for index, field in enumerate(ordering)
+        ]
+
+    @property
+    def sample_queryset(self):
+        """Queryset, по аннотациям которого разбираются значения курсора."""
+        return self.object_list
+
+    @property
+    def last_cursor(self):
+        return self.encode_cursor(None, backwards=True)
+
+    def encode_cursor(self, values, backwards=False):
+        # isoformat() без усечения микросекунд, иначе ключ не совпадёт.
+        payload = json.dumps(
+            [int(backwards), values], default=lambda value: value.isoformat()
+        )
+        token = base64.urlsafe_b64encode(payload.encode())
+        return token.decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        queryset = self._annotate(self.sample_queryset)
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            payload = base64.urlsafe_b64decode(cursor + padding)
+            backwards, values = json.loads(payload.decode())
+            if values is not None:
+                if len(values) != len(self.keys):
+                    raise ValueError
+                values = [
+                    queryset.query.annotations[alias].output_field.to_python(
+                        value
+                    )
+                    for (alias, _, _), value in zip(self.keys, values)
+                ]
+                # Сравнение с NULL в запросе не построить.
+                if None in values:
+                    raise ValueError
+        except (TypeError, ValueError, ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+        return values, bool(backwards)
+
+    def get_page(self, cursor):
+        """Возвращает страницу, а для битого курсора — первую."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def page(self, cursor):
+        values, backwards = None, False
+        if cursor:
+            values, backwards = self.decode_cursor(cursor)
+        rows = self._fetch(values, backwards, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        if not rows:
+            has_next = has_previous = False
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        page = self._get_page(rows, number, self)
+        page.next_cursor = page.previous_cursor = None
+        if has_next:
+            page.next_cursor = self.encode_cursor(self._key(rows[-1]))
+        if has_previous:
+            page.previous_cursor = self.encode_cursor(
+                self._key(rows[0]), backwards=True
+            )
+        return page
+
+    def _annotate(self, queryset):
+        return queryset.annotate(
+            **{alias: F(field) for alias, field, _ in self.keys}
+        )
+
+    def window(self, queryset, values, backwards, limit):
+        """Запрос на limit записей после ключа values в нужную сторону."""
+        ordering = [
+            alias if descending == backwards else f'-{alias}'
+            for alias, _, descending in self.keys
+        ]
+        queryset = self._annotate(queryset).order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+        return queryset[:limit]
+
+    def _fetch(self, values, backwards, limit):
+        return list(self.window(self.object_list, values, backwards, limit))
+
+    def _key(self, row):
+        if isinstance(row, dict):
+            return [row[alias] for alias, _, _ in self.keys]
+        return [getattr(row, alias) for alias, _, _ in self.keys]
+
+    def _seek(self, values, backwards):
+        # (a, b) < (x, y)  =>  a <= x AND (a < x OR (a = x AND b < y));
+        # лишнее a <= x даёт SQLite поиск по диапазону индекса.
+        condition = Q()
+        for index, (alias, _, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != backwards else 'gt'
+            step = Q(**{f'{alias}__{lookup}': values[index]})
+            for (prev_alias, _, _), value in zip(self.keys, values[:index]):
+                step &= Q(**{prev_alias: value})
+            condition |= step
+        alias, _, descending = self.keys[0]
+        lookup = 'lte' if descending != backwards else 'gte'
+        return Q(**{f'{alias}__{lookup}': values[0]}) & condition
+
+
+class MergeCursorPaginator(CursorPaginator):
+    """Курсорная лента, слитая из нескольких отсортированных источников.
+
+    Из каждого queryset берётся не больше страницы записей после
+    курсора, а срезы сливаются heapq.merge: стоимость страницы зависит
+    от числа источников, а не от размера таблицы.
+    """
+
+    def __init__(self, querysets, per_page, ordering=FEED_ORDERING):
+        super().__init__(list(querysets), per_page, ordering)
+        if len({descending for _, _, descending in self.keys}) > 1:
+            raise ValueError('Все ключи слияния должны идти в одну сторону.')
+
+    @cached_property
+    def count(self):
+        return sum(queryset.count() for queryset in self.object_list)
+
+    def page(self, cursor):
+        if not self.object_list:
+            return super().page(None)
+        return super().page(cursor)
+
+    @property
+    def sample_queryset(self):
+        return self.object_list[0]
 
-from .conf import NUMBER_OF_POSTED
+    def _fetch(self, values, backwards, limit):
+        descending = self.keys[0][2]
+        slices = [
+            self.window(queryset, values, backwards, limit)
+            for queryset in self.object_list
+        ]
+        merged = heapq.merge(
+            *slices, key=self._key, reverse=descending != backwards
+        )
+        return list(islice(merged, limit))
 
 
-def get_page(queryset, request):
-    paginator = Paginator(queryset, NUMBER_OF_POSTED)
+def get_page(queryset, request, ordering=FEED_ORDERING):
+    """Старые ссылки ?page= обслуживаются по номеру, остальные — курсором."""
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None:
+        paginator = CachedCountPaginator(
+            queryset.order_by(*ordering), NUMBER_OF_POSTED
+        )
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(queryset, NUMBER_OF_POSTED, ordering)
+    return paginator.get_page(request.GET.get('cursor'))
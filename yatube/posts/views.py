@@ -1,19 +1,36 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import (HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from core.sqlite import retry_on_busy
+
+from . import exporter, thumbnails
+from .autocomplete import GROUP, USER
+from .autocomplete import index as prefix_index
+from .cache import versioned_cache_page
+from .conditions import feed_condition, post_condition
+from .conf import NUMBER_OF_POSTED, PAGE_CACHE_TIMEOUT
+from .counters import get_stats
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import get_page
+from .models import Comment, Follow, Group, Post, User
+from .search import SearchResults
+from .timeline import get_follow_page
+from .utils import CachedCountPaginator, get_page
 
 User = get_user_model()
 
 
-@cache_page(20, key_prefix='index_page')
+@feed_condition('index')
+@versioned_cache_page(PAGE_CACHE_TIMEOUT, 'index')
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
     page_obj = get_page(post_list, request)
     context = {
         'page_obj': page_obj,
@@ -21,10 +38,12 @@ def index(request):
     return render(request, template, context)
 
 
+@feed_condition('group:{slug}')
+@versioned_cache_page(PAGE_CACHE_TIMEOUT, 'group:{slug}')
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_obj = get_page(posts, request)
     context = {
         'group': group,
@@ -33,11 +52,12 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@feed_condition('profile:{username}')
+@versioned_cache_page(PAGE_CACHE_TIMEOUT, 'profile:{username}')
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    page_obj = get_page(author.posts.all(), request)
-    paginator = getattr(page_obj, 'paginator')
-    count_of_posts = paginator.count
+    page_obj = get_page(author.posts.for_feed(), request)
+    stats = get_stats(author)
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
         author=author
@@ -45,16 +65,24 @@ def profile(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'count_of_posts': count_of_posts,
+        'count_of_posts': stats.posts_count,
+        'stats': stats,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@post_condition
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    with_authors = Prefetch(
+        'comments',
+        queryset=Comment.objects.select_related('author').order_by('created')
+    )
+    post = get_object_or_404(
+        Post.objects.for_feed().prefetch_related(with_authors), pk=post_id
+    )
     author = post.author
-    count_of_posts = Post.objects.filter(author=author).count()
+    count_of_posts = get_stats(author).posts_count
     group = post.group
     form = CommentForm()
     comments = post.comments.all()
@@ -69,7 +97,35 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = CachedCountPaginator(SearchResults(query), NUMBER_OF_POSTED)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def autocomplete(request):
+    kind = request.GET.get('type') or None
+    if kind not in (None, GROUP, USER):
+        return HttpResponseBadRequest('Неизвестный тип подсказок.')
+    results = prefix_index.search(request.GET.get('q', ''), kind)
+    return JsonResponse({'results': results})
+
+
+def enqueue_thumbnail(name):
+    # Повторённая или откатившаяся попытка записи в очередь не попадёт.
+    transaction.on_commit(
+        lambda: thumbnails.enqueue(name, requeue=False)
+    )
+
+
 @login_required
+@retry_on_busy
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -77,6 +133,8 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        if new_post.image:
+            enqueue_thumbnail(new_post.image.name)
         return redirect(
             'posts:profile',
             username=request.user.username
@@ -85,6 +143,7 @@ def post_create(request):
 
 
 @login_required
+@retry_on_busy
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     is_edit = True
@@ -97,7 +156,9 @@ def post_edit(request, post_id):
             instance=post
         )
         if form.is_valid():
-            form.save()
+            post = form.save()
+            if 'image' in form.changed_data and post.image:
+                enqueue_thumbnail(post.image.name)
             return redirect(
                 'posts:post_detail',
                 post_id
@@ -112,6 +173,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_busy
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -125,8 +187,7 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page(post_list, request)
+    page_obj = get_follow_page(request)
     return render(
         request,
         'posts/follow.html',
@@ -135,6 +196,23 @@ def follow_index(request):
 
 
 @login_required
+def export(request):
+    kind = request.GET.get('kind', 'posts')
+    file_format = request.GET.get('format', 'jsonl')
+    if kind not in exporter.KINDS or file_format not in exporter.FORMATS:
+        return HttpResponseBadRequest('Неизвестный вид или формат выгрузки.')
+    response = StreamingHttpResponse(
+        exporter.lines(request.user, kind, file_format),
+        content_type=exporter.FORMATS[file_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{kind}.{file_format}"'
+    )
+    return response
+
+
+@login_required
+@retry_on_busy
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
@@ -148,6 +226,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_busy
 def profile_unfollow(request, username):
     user = request.user
     follow = get_object_or_404(Follow, user=user, author__username=username)
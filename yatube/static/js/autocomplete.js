@@ -0,0 +1,34 @@
+// <select data-autocomplete-url> приходит только с выбранным вариантом:
+// остальные подгружаются из автодополнения по мере ввода.
+document.querySelectorAll('select[data-autocomplete-url]').forEach(function (select) {
+  var input = document.createElement('input');
+  var timer;
+  input.type = 'search';
+  input.className = 'form-control mb-2';
+  input.placeholder = 'Начните вводить название';
+  select.parentNode.insertBefore(input, select);
+
+  function show(results) {
+    Array.prototype.slice.call(select.options).forEach(function (option) {
+      if (option.value && !option.selected) {
+        select.removeChild(option);
+      }
+    });
+    results.forEach(function (result) {
+      if (String(result.id) === select.value) {
+        return;
+      }
+      select.appendChild(new Option(result.title || result.username, result.id));
+    });
+  }
+
+  input.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(function () {
+      var url = select.dataset.autocompleteUrl + '&q=' + encodeURIComponent(input.value);
+      fetch(url)
+        .then(function (response) { return response.json(); })
+        .then(function (data) { show(data.results); });
+    }, 200);
+  });
+});